@@ -0,0 +1,148 @@
+"""Script to distill a smaller query encoder from the embedding model.
+
+The student keeps a subset of the teacher's transformer layers and is trained
+to reproduce the teacher's embeddings (MSE) on a sample of the indexed chunks,
+so its query embeddings live in the same space as the existing index.
+"""
+
+import argparse
+import logging
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from export_embedder import export_model
+
+from src.config import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--layers", type=int, default=2, help="Student transformer layers")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument(
+        "--sample-size", type=int, default=20000, help="Chunks used for distillation"
+    )
+    parser.add_argument(
+        "--eval-size", type=int, default=500, help="Held-out pseudo-queries for evaluation"
+    )
+    parser.add_argument("--top-k", type=int, default=settings.VECTOR_TOP_K)
+    parser.add_argument("--output-dir", type=Path, default=None)
+    return parser.parse_args()
+
+
+def load_corpus_texts() -> list:
+    """Load chunk texts from the saved index metadata."""
+    import pyarrow.parquet as pq
+
+    metadata_path = settings.INDEX_DIR / "metadata.parquet"
+    table = pq.read_table(str(metadata_path), columns=["page_content"])
+    return table.column("page_content").to_pylist()
+
+
+def build_student(num_layers: int):
+    """Copy the teacher and keep `num_layers` evenly spaced transformer layers."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    student = SentenceTransformer(settings.EMBEDDING_MODEL, device=settings.EMBEDDING_DEVICE)
+    auto_model = student[0].auto_model
+    layers = auto_model.encoder.layer
+
+    keep = np.linspace(0, len(layers) - 1, num_layers).round().astype(int)
+    auto_model.encoder.layer = torch.nn.ModuleList([layers[i] for i in keep])
+    auto_model.config.num_hidden_layers = num_layers
+
+    logger.info(f"Student keeps teacher layers {keep.tolist()}")
+    return student
+
+
+def overlap_at_k(teacher, student, queries: list, docs: list, top_k: int) -> float:
+    """Mean overlap between student and teacher top-k results over a document set."""
+    doc_embeddings = teacher.encode(docs, normalize_embeddings=True)
+    teacher_q = teacher.encode(queries, normalize_embeddings=True)
+    student_q = student.encode(queries, normalize_embeddings=True)
+
+    teacher_top = np.argsort(-teacher_q @ doc_embeddings.T, axis=1)[:, :top_k]
+    student_top = np.argsort(-student_q @ doc_embeddings.T, axis=1)[:, :top_k]
+
+    overlaps = [
+        len(set(t) & set(s)) / top_k for t, s in zip(teacher_top, student_top)
+    ]
+    return float(np.mean(overlaps))
+
+
+def main():
+    """Distill, evaluate and export the query encoder."""
+    args = parse_args()
+
+    try:
+        from sentence_transformers import InputExample, SentenceTransformer, losses
+        from torch.utils.data import DataLoader
+    except ImportError:
+        logger.error("sentence-transformers (with torch) is required for distillation")
+        return
+
+    output_dir = args.output_dir or (
+        settings.DATA_DIR / "models" / f"minilm-l{args.layers}-query"
+    )
+
+    # Step 1: Sample training and evaluation texts
+    logger.info("\n[1/4] Loading corpus sample...")
+    texts = load_corpus_texts()
+    random.Random(0).shuffle(texts)
+    eval_docs = texts[:args.eval_size]
+    train_texts = texts[args.eval_size:args.eval_size + args.sample_size]
+    # Use the first sentence of each held-out chunk as a pseudo-query
+    eval_queries = [doc.split(". ")[0] for doc in eval_docs]
+    logger.info(f"Training on {len(train_texts)} chunks, evaluating on {len(eval_docs)}")
+
+    # Step 2: Distill (MSE between student and teacher embeddings)
+    logger.info(f"\n[2/4] Distilling {args.layers}-layer student...")
+    teacher = SentenceTransformer(settings.EMBEDDING_MODEL, device=settings.EMBEDDING_DEVICE)
+    student = build_student(args.layers)
+
+    teacher_embeddings = teacher.encode(
+        train_texts, batch_size=args.batch_size, show_progress_bar=True
+    )
+    examples = [
+        InputExample(texts=[text], label=embedding)
+        for text, embedding in zip(train_texts, teacher_embeddings)
+    ]
+    loader = DataLoader(examples, shuffle=True, batch_size=args.batch_size)
+    student.fit(
+        train_objectives=[(loader, losses.MSELoss(model=student))],
+        epochs=args.epochs,
+        show_progress_bar=True,
+    )
+    student.save(str(output_dir))
+
+    # Step 3: Compare student retrieval against teacher-only retrieval
+    logger.info("\n[3/4] Evaluating against teacher...")
+    overlap = overlap_at_k(teacher, student, eval_queries, eval_docs, args.top_k)
+    logger.info(f"Overlap@{args.top_k} with teacher results: {overlap:.3f}")
+
+    # Step 4: Export to ONNX + INT8
+    logger.info("\n[4/4] Exporting student to ONNX...")
+    onnx_dir = output_dir.parent / f"{output_dir.name}-onnx-int8"
+    model_path = export_model(str(output_dir), onnx_dir)
+
+    logger.info(f"\nQuery encoder saved to: {model_path}")
+    logger.info(f"Set EMBEDDING_QUERY_ONNX_DIR={onnx_dir} to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Script to export the embedding model to ONNX with INT8 dynamic quantization."""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model",
+        default=settings.EMBEDDING_MODEL,
+        help="Hugging Face model name or local sentence-transformers directory",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=settings.EMBEDDING_ONNX_DIR,
+        help="Directory to write the ONNX model and tokenizer to",
+    )
+    parser.add_argument(
+        "--skip-optimize",
+        action="store_true",
+        help="Quantize the exported graph directly, without BERT graph fusion",
+    )
+    parser.add_argument(
+        "--optimization-level",
+        choices=["O2", "O3"],
+        default="O3",
+        help="O2: fuse attention, GELU and LayerNorm; O3: also approximate GELU (as optimum's O3)",
+    )
+    return parser.parse_args()
+
+
+def optimize_graph(model_path: Path, output_path: Path, level: str = "O3") -> None:
+    """Fuse attention, GELU and LayerNorm subgraphs with the ORT transformer optimizer."""
+    from onnxruntime.transformers import optimizer
+    from onnxruntime.transformers.fusion_options import FusionOptions
+
+    options = FusionOptions("bert")
+    options.enable_gelu_approximation = level == "O3"
+
+    # num_heads/hidden_size of 0 let the optimizer detect them from the graph
+    optimized = optimizer.optimize_model(
+        str(model_path),
+        model_type="bert",
+        num_heads=0,
+        hidden_size=0,
+        optimization_options=options,
+    )
+    optimized.save_model_to_file(str(output_path))
+
+
+def export_model(
+    model_name: str,
+    output_dir: Path,
+    optimize: bool = True,
+    optimization_level: str = "O3",
+) -> Path:
+    """Export a model to ONNX, optionally optimize it, and quantize it to INT8."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Step 1: Export FP32 ONNX graph
+    logger.info(f"\n[1/3] Exporting {model_name} to ONNX...")
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+
+    # Step 2: Offline transformer graph optimization
+    source_file = "model.onnx"
+    if optimize:
+        logger.info(f"\n[2/3] Optimizing BERT graph ({optimization_level})...")
+        source_file = "model_optimized.onnx"
+        optimize_graph(output_dir / "model.onnx", output_dir / source_file, optimization_level)
+    else:
+        logger.info("\n[2/3] Skipping graph optimization")
+
+    # Step 3: Dynamic INT8 quantization (AVX-512 VNNI kernels)
+    logger.info("\n[3/3] Applying INT8 dynamic quantization...")
+    quantizer = ORTQuantizer.from_pretrained(output_dir, file_name=source_file)
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=output_dir, quantization_config=qconfig)
+
+    quantized_path = output_dir / f"{Path(source_file).stem}_quantized.onnx"
+    model_path = output_dir / settings.EMBEDDING_ONNX_FILE
+    quantized_path.replace(model_path)
+    return model_path
+
+
+def main():
+    """Export and quantize the embedding model."""
+    args = parse_args()
+
+    try:
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError:
+        logger.error("optimum is not installed. Install with: pip install 'optimum[onnxruntime]'")
+        return
+
+    model_path = export_model(
+        args.model,
+        args.output_dir,
+        optimize=not args.skip_optimize,
+        optimization_level=args.optimization_level,
+    )
+
+    logger.info(f"\nQuantized model saved to: {model_path}")
+    logger.info("Set EMBEDDING_BACKEND=onnx to use it.")
+
+
+if __name__ == "__main__":
+    main()
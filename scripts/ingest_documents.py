@@ -1,6 +1,7 @@
 """Script to ingest documents from the data/documents directory."""
 
 import sys
+import argparse
 import logging
 from pathlib import Path
 
@@ -8,9 +9,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import settings
-from src.ingestion.document_loader import DocumentLoader
+from src.ingestion.document_loader import DocumentLoader, iter_supported_files
 from src.ingestion.text_processor import TextProcessor
 from src.ingestion.embedder import Embedder
+from src.search.corpus import Corpus
 from src.search.vector_store import VectorStore
 from src.search.keyword_search import KeywordSearch
 
@@ -21,27 +23,45 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for loading files "
+             "(default: INGEST_WORKERS or CPU count - 1)",
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main ingestion pipeline."""
+    args = parse_args()
+    
     logger.info("=" * 80)
     logger.info("Starting Document Ingestion Pipeline")
     logger.info("=" * 80)
     
-    # Check if documents directory has files
-    doc_files = list(settings.DOCUMENTS_DIR.glob("**/*"))
-    doc_files = [f for f in doc_files if f.is_file()]
+    # Check if documents directory has supported files
+    doc_files = list(iter_supported_files(
+        settings.DOCUMENTS_DIR, tuple(DocumentLoader.SUPPORTED_EXTENSIONS)
+    ))
     
     if not doc_files:
         logger.warning(f"No documents found in {settings.DOCUMENTS_DIR}")
         logger.info("Please add documents (PDF, TXT, DOCX) to the data/documents/ directory")
         return
     
-    logger.info(f"Found {len(doc_files)} files in {settings.DOCUMENTS_DIR}")
+    logger.info(f"Found {len(doc_files)} supported files in {settings.DOCUMENTS_DIR}")
     
     # Step 1: Load documents
     logger.info("\n[1/5] Loading documents...")
     loader = DocumentLoader()
-    documents = loader.load_directory(settings.DOCUMENTS_DIR, recursive=True)
+    documents = loader.load_directory(
+        settings.DOCUMENTS_DIR, recursive=True, workers=args.workers
+    )
     
     if not documents:
         logger.error("No documents loaded. Exiting.")
@@ -62,19 +82,22 @@ def main():
     
     # Step 4: Build vector store
     logger.info("\n[4/5] Building FAISS vector index...")
-    vector_store = VectorStore(embedder)
-    vector_store.build_index(chunks)
+    corpus = Corpus()
+    corpus.add_documents(chunks)
+    vector_store = VectorStore(embedder, corpus)
+    vector_store.build_index()
     
     # Step 5: Build keyword search
     logger.info("\n[5/5] Building BM25 keyword index...")
-    keyword_search = KeywordSearch()
-    keyword_search.build_index(chunks)
+    keyword_search = KeywordSearch(corpus)
+    keyword_search.build_index()
     
     # Save indexes
     logger.info("\nSaving indexes to disk...")
     index_path = settings.INDEX_DIR / "faiss_index.bin"
-    metadata_path = settings.INDEX_DIR / "metadata.pkl"
+    metadata_path = settings.INDEX_DIR / "metadata.parquet"
     vector_store.save(index_path, metadata_path)
+    keyword_search.save(settings.INDEX_DIR / "bm25.pkl")
     
     # Summary
     logger.info("\n" + "=" * 80)
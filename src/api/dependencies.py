@@ -1,4 +1,7 @@
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from functools import lru_cache
 
@@ -6,14 +9,29 @@ from src.config import settings
 from src.ingestion.document_loader import DocumentLoader
 from src.ingestion.text_processor import TextProcessor
 from src.ingestion.embedder import Embedder
+from src.ingestion.batching_embedder import BatchingEmbedder
+from src.search.corpus import Corpus
 from src.search.vector_store import VectorStore
 from src.search.keyword_search import KeywordSearch
 from src.search.hybrid_search import HybridSearch
+from src.llm.batcher import LLMBatcher
 from src.llm.generator import LLMGenerator
 
 logger = logging.getLogger(__name__)
 
 
+def _init_search_thread() -> None:
+    """
+    Limit FAISS to one OpenMP thread in each search worker.
+    
+    Concurrent requests then parallelize across the pool rather than each
+    search fanning out over every core (oversubscription inflates latency).
+    The BM25 kernel is serial for the same reason.
+    """
+    import faiss
+    faiss.omp_set_num_threads(1)
+
+
 class RAGSystem:
     """Complete RAG system with all components."""
     
@@ -25,11 +43,38 @@ class RAGSystem:
         self.processor = TextProcessor()
         self.embedder = Embedder()
         
-        self.vector_store = VectorStore(self.embedder)
-        self.keyword_search = KeywordSearch()
-        self.hybrid_search = HybridSearch(self.vector_store, self.keyword_search)
+        # Bounded pool for tokenization + inference, so embedding never blocks
+        # the event loop; the batching embedder submits its batches here
+        self.embedding_executor = ThreadPoolExecutor(
+            max_workers=settings.MAX_CONCURRENT_REQUESTS,
+            thread_name_prefix="embed",
+        )
+        self.batching_embedder = BatchingEmbedder(
+            self.embedder, executor=self.embedding_executor
+        )
+        
+        # One corpus (chunk texts, metadata, tokens) shared by both indexes
+        self.corpus = Corpus()
+        self.vector_store = VectorStore(self.embedder, self.corpus)
+        self.keyword_search = KeywordSearch(self.corpus)
+        
+        # Dedicated pool for FAISS and BM25 queries, kept apart from embedding
+        # so CPU-bound search never queues behind (or blocks) other work
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=settings.SEARCH_WORKERS,
+            thread_name_prefix="faiss",
+            initializer=_init_search_thread,
+        )
+        self.hybrid_search = HybridSearch(
+            self.vector_store, self.keyword_search, executor=self.search_executor
+        )
         
-        self.generator = LLMGenerator()
+        self.generator = LLMGenerator(embedder=self.embedder)
+        self.llm_batcher = LLMBatcher(self.generator)
+        
+        # Serializes changes to the corpus and indexes (ingest, clear): FAISS
+        # ids and BM25 rows must stay aligned with corpus rows
+        self.index_lock = asyncio.Lock()
         
         # Try to load existing indexes
         self.load_indexes()
@@ -39,15 +84,25 @@ class RAGSystem:
     def load_indexes(self):
         """Load existing indexes if available."""
         index_path = settings.INDEX_DIR / "faiss_index.bin"
-        metadata_path = settings.INDEX_DIR / "metadata.pkl"
+        metadata_path = settings.INDEX_DIR / "metadata.parquet"
+        
+        # Fall back to metadata pickled by older versions
+        legacy_metadata_path = settings.INDEX_DIR / "metadata.pkl"
+        if not metadata_path.exists() and legacy_metadata_path.exists():
+            metadata_path = legacy_metadata_path
         
         if index_path.exists() and metadata_path.exists():
             try:
                 logger.info("Loading existing indexes...")
                 self.vector_store.load(index_path, metadata_path)
                 
-                # Rebuild keyword search from loaded documents
-                self.keyword_search.build_index(self.vector_store.documents)
+                # Load keyword search state, rebuilding it if missing or stale
+                bm25_path = settings.INDEX_DIR / "bm25.pkl"
+                try:
+                    self.keyword_search.load(bm25_path)
+                except Exception as e:
+                    logger.info(f"Rebuilding BM25 index ({e})")
+                    self.keyword_search.build_index()
                 
                 logger.info("Indexes loaded successfully")
             except Exception as e:
@@ -56,13 +111,37 @@ class RAGSystem:
         else:
             logger.info("No existing indexes found. Starting fresh.")
     
+    def warmup(self):
+        """
+        Run a throwaway query through the embedding and search paths.
+        
+        The first real request then doesn't pay for ONNX Runtime's first run,
+        search thread start-up or the BM25 kernel's first call. Errors
+        propagate: a path that fails here would fail the first real query.
+        """
+        start = time.perf_counter()
+        
+        embedding = self.embedder.embed_query("warmup")
+        
+        # Run in the search pool so FAISS is warmed with the same
+        # per-thread OpenMP setting as real queries
+        if self.vector_store.index is not None and self.vector_store.index.ntotal > 0:
+            self.search_executor.submit(
+                self.vector_store.search_by_embedding, embedding, 1
+            ).result()
+        self.search_executor.submit(self.keyword_search.warmup).result()
+        
+        logger.info(f"Warmup finished in {(time.perf_counter() - start) * 1000:.0f} ms")
+    
     def save_indexes(self):
         """Save indexes to disk."""
         index_path = settings.INDEX_DIR / "faiss_index.bin"
-        metadata_path = settings.INDEX_DIR / "metadata.pkl"
+        metadata_path = settings.INDEX_DIR / "metadata.parquet"
+        bm25_path = settings.INDEX_DIR / "bm25.pkl"
         
         try:
             self.vector_store.save(index_path, metadata_path)
+            self.keyword_search.save(bm25_path)
             logger.info("Indexes saved successfully")
         except Exception as e:
             logger.error(f"Failed to save indexes: {e}")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -10,10 +10,20 @@ class QueryRequest(BaseModel):
     use_citations: Optional[bool] = Field(True, description="Include citations in response")
 
 
+# Characters of document content included in a source snippet
+SOURCE_SNIPPET_LENGTH = 200
+
+
 class Source(BaseModel):
     """Source document information."""
-    content: str = Field(..., description="Document content snippet")
+    page_content: str = Field(..., exclude=True, description="Full document content (not serialized)")
     metadata: Dict[str, Any] = Field(..., description="Document metadata")
+    
+    @computed_field(description="Document content snippet")
+    @property
+    def content(self) -> str:
+        """Snippet of the content, sliced only when the response is serialized."""
+        return self.page_content[:SOURCE_SNIPPET_LENGTH] + "..."
 
 
 class QueryResponse(BaseModel):
@@ -27,6 +37,17 @@ class QueryResponse(BaseModel):
     total_time_ms: float
 
 
+class BatchQueryRequest(BaseModel):
+    """Request model for answering several queries at once."""
+    queries: List[QueryRequest] = Field(..., description="Queries to answer", min_length=1, max_length=50)
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for a batch of queries."""
+    results: List[QueryResponse]
+    total_time_ms: float
+
+
 class DocumentUploadResponse(BaseModel):
     """Response for document upload."""
     message: str
@@ -58,9 +79,23 @@ class HealthResponse(BaseModel):
     index_stats: Dict[str, Any]
 
 
+class EmbeddingMetricsResponse(BaseModel):
+    """Query embedding batching metrics."""
+    total_requests: int
+    total_batches: int
+    max_batch_size: int
+    max_wait_ms: float
+    avg_batch_size: Optional[float] = None
+    max_observed_batch_size: Optional[int] = None
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
+
+
 class StatsResponse(BaseModel):
     """System statistics response."""
     vector_store: Dict[str, Any]
     keyword_search: Dict[str, Any]
     total_chunks: int
-    total_documents: int
\ No newline at end of file
+    total_documents: int
+    cache: Dict[str, Any]
\ No newline at end of file
@@ -1,18 +1,24 @@
+import asyncio
+import json
 import logging
 import time
 from datetime import datetime
 from pathlib import Path
 from typing import List
+import aiofiles
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from src.api.models import (
     QueryRequest,
     QueryResponse,
+    BatchQueryRequest,
+    BatchQueryResponse,
     DocumentUploadResponse,
     DocumentListResponse,
     HealthResponse,
     StatsResponse,
+    EmbeddingMetricsResponse,
     Source,
     DocumentInfo,
 )
@@ -22,6 +28,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Size of each read when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check(rag_system=Depends(get_rag_system)):
@@ -34,6 +43,29 @@ async def health_check(rag_system=Depends(get_rag_system)):
     )
 
 
+async def _retrieve(rag_system, request: QueryRequest):
+    """
+    Run hybrid search for a query.
+    
+    Cached results skip embedding entirely; otherwise the query embedding is
+    batched with concurrent requests.
+    
+    Returns:
+        (results, query_embedding, retrieval_time_ms)
+    """
+    retrieval_start = time.time()
+    query_embedding = None
+    results = rag_system.hybrid_search.get_cached(request.query, top_k=request.top_k)
+    if results is None:
+        query_embedding = await rag_system.batching_embedder.embed(request.query)
+        results = await rag_system.hybrid_search.asearch(
+            request.query,
+            top_k=request.top_k,
+            query_embedding=query_embedding,
+        )
+    return results, query_embedding, (time.time() - retrieval_start) * 1000
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query_documents(
     request: QueryRequest,
@@ -44,12 +76,7 @@ async def query_documents(
         start_time = time.time()
         
         # Perform hybrid search
-        retrieval_start = time.time()
-        results = rag_system.hybrid_search.search(
-            request.query,
-            top_k=request.top_k
-        )
-        retrieval_time = (time.time() - retrieval_start) * 1000
+        results, query_embedding, retrieval_time = await _retrieve(rag_system, request)
         
         if not results:
             raise HTTPException(
@@ -60,12 +87,13 @@ async def query_documents(
         # Extract documents
         documents = [doc for doc, score in results]
         
-        # Generate response
+        # Generate response (concurrent identical requests share one LLM call)
         generation_start = time.time()
-        response = rag_system.generator.generate(
+        response = await rag_system.llm_batcher.submit(
             request.query,
             documents,
-            use_citations=request.use_citations
+            use_citations=request.use_citations,
+            query_embedding=query_embedding,
         )
         generation_time = (time.time() - generation_start) * 1000
         
@@ -86,6 +114,155 @@ async def query_documents(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(
+    request: BatchQueryRequest,
+    rag_system=Depends(get_rag_system)
+):
+    """Answer several queries, retrieving and generating concurrently."""
+    try:
+        start_time = time.time()
+        
+        # Retrieve for all queries (embeddings share batched forward passes)
+        retrievals = await asyncio.gather(
+            *(_retrieve(rag_system, query) for query in request.queries)
+        )
+        
+        # Queries that retrieved nothing get an answer without an LLM call
+        # (/query returns 404 for them)
+        generation_start = time.time()
+        responses = [
+            None if retrievals[i][0] else {
+                "answer": "No relevant documents found for the query",
+                "sources": [],
+                "model_used": "none",
+            }
+            for i in range(len(request.queries))
+        ]
+        
+        # Generate the other answers concurrently (bounded by LLM_MAX_CONCURRENCY);
+        # citation mode is per query, so group the calls by it
+        for use_citations in (True, False):
+            indices = [
+                i for i, query in enumerate(request.queries)
+                if responses[i] is None and bool(query.use_citations) == use_citations
+            ]
+            if not indices:
+                continue
+            batch = await rag_system.generator.agenerate_batch(
+                [request.queries[i].query for i in indices],
+                [[doc for doc, score in retrievals[i][0]] for i in indices],
+                use_citations=use_citations,
+                query_embeddings=[retrievals[i][1] for i in indices],
+            )
+            for i, response in zip(indices, batch):
+                responses[i] = response
+        generation_time = (time.time() - generation_start) * 1000
+        
+        total_time = (time.time() - start_time) * 1000
+        
+        return BatchQueryResponse(
+            results=[
+                QueryResponse(
+                    query=query.query,
+                    answer=response["answer"],
+                    sources=[Source(**src) for src in response["sources"]],
+                    model_used=response["model_used"],
+                    retrieval_time_ms=retrieval_time,
+                    generation_time_ms=generation_time,
+                    total_time_ms=total_time,
+                )
+                for query, response, (_, _, retrieval_time) in zip(
+                    request.queries, responses, retrievals
+                )
+            ],
+            total_time_ms=total_time,
+        )
+        
+    except Exception as e:
+        logger.error(f"Batch query error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: QueryRequest,
+    rag_system=Depends(get_rag_system)
+):
+    """
+    Query the RAG system and stream the answer as Server-Sent Events.
+    
+    Sends "token" events with pieces of the answer, then a "done" event with
+    the sources, the model used and whether the answer came from the cache.
+    """
+    try:
+        results, query_embedding, _ = await _retrieve(rag_system, request)
+        
+        if not results:
+            raise HTTPException(
+                status_code=404,
+                detail="No relevant documents found for the query"
+            )
+        
+        documents = [doc for doc, score in results]
+        events = rag_system.generator.astream(
+            request.query,
+            documents,
+            use_citations=request.use_citations,
+            query_embedding=query_embedding,
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Stream query error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        async for event in events:
+            if event["event"] == "done":
+                event["data"]["sources"] = [
+                    Source(**src).model_dump() for src in event["data"]["sources"]
+                ]
+            data = json.dumps(event["data"], default=str)
+            yield f"event: {event['event']}\ndata: {data}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _index_files(rag_system, file_paths: List[Path]) -> int:
+    """Load, chunk and index saved files (CPU-bound; run in an executor)."""
+    # Load documents
+    all_docs = []
+    for file_path in file_paths:
+        docs = rag_system.loader.load_file(file_path)
+        all_docs.extend(docs)
+    
+    # Process documents
+    chunks = rag_system.processor.process_documents(all_docs)
+    
+    # Add to the shared corpus, then index the new rows (embeds only the new chunks)
+    rag_system.corpus.add_documents(chunks)
+    rag_system.vector_store.update()
+    rag_system.keyword_search.update()
+    rag_system.hybrid_search.clear_cache()
+    rag_system.generator.clear_cache()
+    
+    # Save indexes
+    rag_system.save_indexes()
+    
+    return len(chunks)
+
+
+def _clear_indexes(rag_system) -> None:
+    """Empty the shared corpus and rebuild empty indexes (run in an executor)."""
+    rag_system.corpus.clear()
+    rag_system.vector_store.build_index()
+    rag_system.keyword_search.build_index()
+    rag_system.hybrid_search.clear_cache()
+    rag_system.generator.clear_cache()
+
+
 @router.post("/ingest", response_model=DocumentUploadResponse)
 async def ingest_documents(
     files: List[UploadFile] = File(...),
@@ -97,34 +274,26 @@ async def ingest_documents(
         
         uploaded_files = []
         
-        # Save uploaded files
+        # Stream uploaded files to disk without buffering them in memory
         for file in files:
             file_path = settings.DOCUMENTS_DIR / file.filename
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            async with aiofiles.open(file_path, "wb") as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
             uploaded_files.append(file_path)
         
-        # Load documents
-        all_docs = []
-        for file_path in uploaded_files:
-            docs = rag_system.loader.load_file(file_path)
-            all_docs.extend(docs)
-        
-        # Process documents
-        chunks = rag_system.processor.process_documents(all_docs)
-        
-        # Rebuild indexes
-        rag_system.vector_store.build_index(chunks)
-        rag_system.keyword_search.build_index(chunks)
-        
-        # Save indexes
-        rag_system.save_indexes()
+        # Keep the event loop responsive while parsing, embedding and indexing;
+        # one ingest or clear at a time
+        loop = asyncio.get_running_loop()
+        async with rag_system.index_lock:
+            chunks_created = await loop.run_in_executor(
+                None, _index_files, rag_system, uploaded_files
+            )
         
         return DocumentUploadResponse(
             message="Documents ingested successfully",
             files_processed=len(files),
-            chunks_created=len(chunks),
+            chunks_created=chunks_created,
             index_updated=True,
         )
         
@@ -137,26 +306,12 @@ async def ingest_documents(
 async def list_documents(rag_system=Depends(get_rag_system)):
     """List all indexed documents."""
     try:
-        # Get unique documents from vector store
-        docs_info = {}
-        
-        for doc in rag_system.vector_store.documents:
-            source = doc.metadata.get("source", "Unknown")
-            
-            if source not in docs_info:
-                docs_info[source] = DocumentInfo(
-                    file_name=doc.metadata.get("file_name", "Unknown"),
-                    file_type=doc.metadata.get("file_type", "Unknown"),
-                    source=source,
-                    loaded_at=doc.metadata.get("loaded_at", "Unknown"),
-                    chunks=0,
-                )
-            
-            docs_info[source].chunks += 1
+        # Per-source summaries are maintained by the vector store at index time
+        sources = rag_system.vector_store.sources
         
         return DocumentListResponse(
-            total_documents=len(docs_info),
-            documents=list(docs_info.values()),
+            total_documents=len(sources),
+            documents=[DocumentInfo(**info) for info in sources.values()],
         )
         
     except Exception as e:
@@ -171,11 +326,17 @@ async def get_statistics(rag_system=Depends(get_rag_system)):
         return StatsResponse(
             vector_store=rag_system.vector_store.get_stats(),
             keyword_search=rag_system.keyword_search.get_stats(),
-            total_chunks=len(rag_system.vector_store.documents),
-            total_documents=len(set(
-                doc.metadata.get("source") 
-                for doc in rag_system.vector_store.documents
-            )),
+            total_chunks=rag_system.vector_store.chunk_count,
+            total_documents=len(rag_system.vector_store.sources),
+            cache={
+                "query_embeddings": rag_system.embedder.query_cache.get_stats(),
+                "search_results": rag_system.hybrid_search.results_cache.get_stats(),
+                "llm_responses": (
+                    rag_system.generator.cache.get_stats()
+                    if rag_system.generator.cache is not None
+                    else {}
+                ),
+            },
         )
         
     except Exception as e:
@@ -183,19 +344,28 @@ async def get_statistics(rag_system=Depends(get_rag_system)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/metrics/embedding", response_model=EmbeddingMetricsResponse)
+async def get_embedding_metrics(rag_system=Depends(get_rag_system)):
+    """Get query embedding batch size and latency metrics."""
+    try:
+        return EmbeddingMetricsResponse(**rag_system.batching_embedder.get_metrics())
+        
+    except Exception as e:
+        logger.error(f"Metrics error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/documents")
 async def clear_documents(rag_system=Depends(get_rag_system)):
     """Clear all documents and rebuild empty indexes."""
     try:
         from src.config import settings
         
-        # Clear indexes
-        rag_system.vector_store.documents = []
-        rag_system.keyword_search.documents = []
-        
-        # Rebuild empty indexes
-        rag_system.vector_store.build_index([])
-        rag_system.keyword_search.build_index([])
+        # Same executor and lock as ingest: rebuilding runs FAISS and BM25
+        # code and clearing the LLM cache touches disk
+        loop = asyncio.get_running_loop()
+        async with rag_system.index_lock:
+            await loop.run_in_executor(None, _clear_indexes, rag_system)
         
         return {"message": "All documents cleared"}
         
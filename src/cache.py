@@ -0,0 +1,48 @@
+"""Thread-safe in-memory LRU cache with hit-rate statistics."""
+
+import threading
+from typing import Any, Hashable, Optional
+
+from cachetools import LRUCache
+
+
+class StatsLRUCache:
+    """LRU cache guarded by an RLock that tracks hits and misses."""
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self) -> None:
+        """Remove all entries (statistics are kept)."""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache size and hit-rate statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self._cache.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
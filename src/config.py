@@ -25,15 +25,44 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
     EMBEDDING_DEVICE: str = "cpu"  # or "cuda" for GPU
+    EMBEDDING_BACKEND: str = "onnx"  # "onnx" (INT8 ONNX Runtime) or "torch"
+    EMBEDDING_ONNX_DIR: Path = DATA_DIR / "models" / "all-MiniLM-L6-v2-onnx-int8"
+    EMBEDDING_ONNX_FILE: str = "model_quantized.onnx"
+    EMBEDDING_QUERY_ONNX_DIR: Optional[Path] = None  # Distilled query encoder (ONNX backend)
+    EMBEDDING_MAX_SEQ_LENGTH: int = 256
+    EMBEDDING_THREADS: Optional[int] = None  # ONNX intra-op threads (defaults to CPU count)
+    EMBEDDING_BATCH_SIZE: int = 64  # Batch size for bulk (ingestion) embedding
+    EMBEDDING_MAX_BATCH_SIZE: int = 32  # Max queries coalesced into one forward pass
+    EMBEDDING_MAX_WAIT_MS: float = 5.0  # Max time a query waits for its batch to fill
+    
+    # Ingestion
+    INGEST_WORKERS: Optional[int] = None  # Defaults to cpu_count() - 1
     
     # Text Processing
     CHUNK_SIZE: int = 800
     CHUNK_OVERLAP: int = 200
+    MIN_CHUNK_CHARS: int = 30  # Shorter chunks are dropped before embedding
     
     # Search Settings
+    FAISS_USE_GPU: bool = True  # Build indexes on GPU when faiss-gpu and a GPU are available
+    FAISS_INDEX_TYPE: str = "hnsw"  # "hnsw", "ivf_sq8", "ivf_pq" (lossy, opt-in) or "flat"
+    FAISS_PQ_M: Optional[int] = None  # PQ sub-quantizers (defaults to dimension // 8)
+    FAISS_PQ_NBITS: int = 8  # Bits per PQ code
+    FAISS_HNSW_M: int = 32  # HNSW graph neighbors per node
+    FAISS_HNSW_EF_CONSTRUCTION: int = 200  # HNSW build-time candidate list size
+    FAISS_HNSW_EF_SEARCH: int = 64  # HNSW query-time candidate list size (recall vs. speed)
+    FAISS_NLIST: int = 1024  # Max IVF lists (scaled down for small corpora)
+    FAISS_NPROBE: int = 16  # IVF lists scanned per query (recall vs. speed)
+    FAISS_MIN_TRAIN_SIZE: int = 1000  # Below this, use an exact flat index
+    FAISS_RETRAIN_GROWTH: float = 2.0  # Rebuild an IVF index once it grows this much past its training size
+    FAISS_MMAP: bool = True  # Memory-map IVF indexes on load instead of reading them into RAM
     VECTOR_TOP_K: int = 10
     KEYWORD_TOP_K: int = 10
     HYBRID_TOP_K: int = 5
+    QUERY_CACHE_SIZE: int = 10000  # Cached query embeddings (LRU)
+    SEARCH_CACHE_SIZE: int = 1000  # Cached hybrid search results (LRU)
+    SEARCH_WORKERS: int = 4  # Threads for FAISS/BM25 search (one OpenMP thread each)
+    WARMUP_ON_STARTUP: bool = True  # Run a throwaway query through the search paths at startup
     VECTOR_WEIGHT: float = 0.7
     KEYWORD_WEIGHT: float = 0.3
     
@@ -44,6 +73,14 @@ class Settings(BaseSettings):
     LLM_MODEL: str = "llama-3.1-70b-versatile"  # or "llama-3.3-70b-versatile"
     LLM_TEMPERATURE: float = 0.1
     LLM_MAX_TOKENS: int = 500
+    LLM_MAX_CONCURRENCY: int = 8  # In-flight async LLM requests (provider rate limits)
+    LLM_HTTP_MAX_CONNECTIONS: int = 64  # Pooled connections to the LLM provider
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 32
+    LLM_HTTP_TIMEOUT: float = 60.0  # Seconds
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: Path = DATA_DIR / "llm_cache"  # Exact-match responses (diskcache)
+    LLM_CACHE_SIMILARITY_THRESHOLD: float = 0.92  # Min cosine similarity for a semantic hit
+    LLM_CACHE_MAX_SEMANTIC_ENTRIES: int = 10000
     
     # AWS Bedrock Settings (optional)
     AWS_REGION: str = "us-east-1"
@@ -0,0 +1,155 @@
+"""Dynamic micro-batching of concurrent query embeddings."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.ingestion.embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingEmbedder:
+    """
+    Coalesce concurrent single-text embedding requests into batched forward passes.
+
+    Requests are queued as (text, Future) pairs. A background task drains up to
+    `max_batch_size` items, waiting at most `max_wait_ms` for the batch to fill,
+    embeds them in one `embed_queries` call and resolves each future.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_batch_size: int = settings.EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms: float = settings.EMBEDDING_MAX_WAIT_MS,
+        executor: Optional[Executor] = None,
+        metrics_window: int = 1000,
+    ):
+        self.embedder = embedder
+        self.executor = executor  # Runs tokenization + inference off the event loop
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Rolling metrics over the most recent batches
+        self._batch_sizes: Deque[int] = deque(maxlen=metrics_window)
+        self._batch_latencies_ms: Deque[float] = deque(maxlen=metrics_window)
+        self._total_requests = 0
+        self._total_batches = 0
+
+    def _ensure_worker(self) -> None:
+        """Start the background batching task on the running event loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single query, sharing a forward pass with concurrent callers.
+
+        Queries found in the embedder's LRU cache skip the model entirely.
+        """
+        embedding = self.embedder.get_cached_query_embedding(text)
+        if embedding is not None:
+            return embedding
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        embedding = await future
+        self.embedder.cache_query_embedding(text, embedding)
+        return embedding
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for one request, then gather more until the batch is full or time is up."""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        """Background loop: drain the queue and embed in batches."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect_batch()
+            texts = [text for text, _ in batch]
+
+            start = time.perf_counter()
+            try:
+                embeddings = await loop.run_in_executor(
+                    self.executor,
+                    self.embedder.embed_queries,
+                    texts,
+                )
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self._record(len(batch), (time.perf_counter() - start) * 1000)
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+    def _record(self, batch_size: int, latency_ms: float) -> None:
+        """Record metrics for a completed batch."""
+        self._batch_sizes.append(batch_size)
+        self._batch_latencies_ms.append(latency_ms)
+        self._total_requests += batch_size
+        self._total_batches += 1
+
+    def get_metrics(self) -> dict:
+        """Get batch size and latency statistics over recent batches."""
+        if not self._batch_sizes:
+            return {
+                "total_requests": 0,
+                "total_batches": 0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+            }
+
+        sizes = np.array(self._batch_sizes)
+        latencies = np.array(self._batch_latencies_ms)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+        return {
+            "total_requests": self._total_requests,
+            "total_batches": self._total_batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "avg_batch_size": float(sizes.mean()),
+            "max_observed_batch_size": int(sizes.max()),
+            "latency_p50_ms": float(p50),
+            "latency_p95_ms": float(p95),
+            "latency_p99_ms": float(p99),
+        }
+
+    async def close(self) -> None:
+        """Stop the background batching task."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
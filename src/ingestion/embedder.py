@@ -1,50 +1,315 @@
 import logging
-from typing import List
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
+import xxhash
+from tqdm import tqdm
 
+from src.cache import StatsLRUCache
 from src.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class OnnxEncoder:
+    """A quantized ONNX sentence encoder: session, tokenizer and pooling."""
+
+    def __init__(self, model_path: Path, max_seq_length: int):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        logger.info(f"Loading ONNX embedding model: {model_path}")
+        opts = ort.SessionOptions()
+        # Constant folding, redundant node elimination and operator fusion
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # BERT graphs are a single chain: parallelize within ops, not across them
+        opts.intra_op_num_threads = settings.EMBEDDING_THREADS or os.cpu_count() or 1
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=opts,
+            providers=["CPUExecutionProvider"],
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_path.parent))
+        self.max_seq_length = max_seq_length
+        self.input_names = [inp.name for inp in self.session.get_inputs()]
+        self.output_name = self.session.get_outputs()[0].name
+        self._local = threading.local()  # Per-thread IOBinding and buffers
+
+        hidden_size = self.session.get_outputs()[0].shape[-1]
+        self.embedding_dim = (
+            hidden_size if isinstance(hidden_size, int) else settings.EMBEDDING_DIMENSION
+        )
+
+    def _get_binding(self):
+        """
+        Get this thread's IOBinding and preallocated single-row buffers.
+
+        Bindings are not thread-safe, so each FastAPI worker thread gets its own.
+        """
+        binding = getattr(self._local, "binding", None)
+        if binding is None:
+            binding = self.session.io_binding()
+            self._local.binding = binding
+            self._local.input_buffers = {
+                name: np.zeros((1, self.max_seq_length), dtype=np.int64)
+                for name in self.input_names
+            }
+            self._local.output_buffer = np.zeros(
+                (1, self.max_seq_length, self.embedding_dim), dtype=np.float32
+            )
+        return binding
+
+    def _run_session(self, inputs: dict) -> np.ndarray:
+        """
+        Run the ONNX session through IOBinding and return token embeddings.
+
+        Single-row inputs (queries) are copied into preallocated per-thread
+        buffers and the output is written straight into a bound buffer, so the
+        per-query path does no tensor allocation.
+        """
+        binding = self._get_binding()
+        batch, seq_len = inputs["attention_mask"].shape
+
+        if batch == 1:
+            for name, values in inputs.items():
+                buffer = self._local.input_buffers[name][:, :seq_len]
+                buffer[:] = values
+                binding.bind_cpu_input(name, buffer)
+
+            output = self._local.output_buffer[:, :seq_len]
+            binding.bind_output(
+                self.output_name, "cpu", 0, np.float32, list(output.shape),
+                output.ctypes.data,
+            )
+            self.session.run_with_iobinding(binding)
+            return output
+
+        for name, values in inputs.items():
+            binding.bind_cpu_input(name, values)
+        binding.bind_output(self.output_name, "cpu")
+        self.session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()[0]
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int,
+        show_progress: bool,
+    ) -> np.ndarray:
+        """
+        Run the ONNX session, then mean-pool and L2-normalize in NumPy.
+
+        Texts are processed in length-sorted batches so each batch pads to a
+        similar length, and the results are scattered back to input order.
+        """
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        batches = []
+
+        for start in tqdm(
+            range(0, len(sorted_texts), batch_size),
+            desc="Batches",
+            disable=not show_progress,
+        ):
+            encoded = self.tokenizer(
+                sorted_texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            inputs = {
+                name: np.ascontiguousarray(encoded[name], dtype=np.int64)
+                for name in self.input_names
+                if name in encoded
+            }
+            token_embeddings = self._run_session(inputs)
+
+            # Mean pooling over non-padding tokens
+            mask = inputs["attention_mask"][..., np.newaxis].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings = summed / counts
+
+            # L2 normalization
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            batches.append(embeddings / np.clip(norms, 1e-12, None))
+
+        if not batches:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)
+        return embeddings
+
+
 class Embedder:
-    """Generate embeddings for text using sentence-transformers."""
-    
+    """
+    Generate embeddings for text.
+
+    Uses an INT8-quantized ONNX Runtime export of the embedding model when
+    available (see scripts/export_embedder.py), and falls back to the FP32
+    sentence-transformers model otherwise.
+
+    With the ONNX backend, queries can be encoded by a smaller distilled
+    student (EMBEDDING_QUERY_ONNX_DIR, see scripts/distill_query_encoder.py)
+    while documents keep using the teacher model the index was built with.
+
+    All embeddings are returned as L2-normalized, C-contiguous float32 arrays,
+    which FAISS consumes without an internal copy; callers should not re-cast.
+    """
+
     def __init__(
         self,
         model_name: str = settings.EMBEDDING_MODEL,
         device: str = settings.EMBEDDING_DEVICE,
+        backend: str = settings.EMBEDDING_BACKEND,
+        onnx_model_dir: Path = settings.EMBEDDING_ONNX_DIR,
+        query_onnx_model_dir: Optional[Path] = settings.EMBEDDING_QUERY_ONNX_DIR,
     ):
         self.model_name = model_name
         self.device = device
-        
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name, device=device)
-        self.embedding_dim = self.model.get_sentence_embedding_dimension()
+        self.backend = backend.lower()
+        self.max_seq_length = settings.EMBEDDING_MAX_SEQ_LENGTH
+        self.model = None
+        self.doc_model: Optional[OnnxEncoder] = None
+        self.query_model: Optional[OnnxEncoder] = None
+        self.query_cache = StatsLRUCache(maxsize=settings.QUERY_CACHE_SIZE)
+
+        onnx_model_path = Path(onnx_model_dir) / settings.EMBEDDING_ONNX_FILE
+        if self.backend == "onnx" and onnx_model_path.exists():
+            self.doc_model = OnnxEncoder(onnx_model_path, self.max_seq_length)
+            self.embedding_dim = self.doc_model.embedding_dim
+            self.query_model = self._load_query_model(query_onnx_model_dir)
+        else:
+            if self.backend == "onnx":
+                logger.warning(
+                    f"ONNX model not found at {onnx_model_path}. "
+                    "Run scripts/export_embedder.py to build it. "
+                    "Falling back to sentence-transformers."
+                )
+                self.backend = "torch"
+            self._load_torch()
+
         logger.info(f"Model loaded. Embedding dimension: {self.embedding_dim}")
-    
+
+    def _load_query_model(self, query_onnx_model_dir: Optional[Path]) -> OnnxEncoder:
+        """Load the distilled query encoder, or reuse the document model."""
+        if query_onnx_model_dir is None:
+            return self.doc_model
+
+        query_model_path = Path(query_onnx_model_dir) / settings.EMBEDDING_ONNX_FILE
+        if not query_model_path.exists():
+            logger.warning(
+                f"Query model not found at {query_model_path}. "
+                "Using the document model for queries."
+            )
+            return self.doc_model
+
+        query_model = OnnxEncoder(query_model_path, self.max_seq_length)
+        if query_model.embedding_dim != self.embedding_dim:
+            logger.warning(
+                f"Query model dimension ({query_model.embedding_dim}) does not match "
+                f"the document model ({self.embedding_dim}). "
+                "Using the document model for queries."
+            )
+            return self.doc_model
+
+        logger.info("Using distilled query encoder for queries")
+        return query_model
+
+    def _load_torch(self) -> None:
+        """
+        Load the sentence-transformers (PyTorch) model.
+
+        On CUDA the weights are cast to FP16 (encode already runs without
+        autograd); on CPU all cores are given to intra-op parallelism.
+        """
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Loading embedding model: {self.model_name}")
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+        self.embedding_dim = self.model.get_sentence_embedding_dimension()
+
+        if self.device.startswith("cuda"):
+            self.model.half()
+        else:
+            torch.set_num_threads(os.cpu_count() or 1)
+
     def embed_text(self, text: str) -> np.ndarray:
-        """Generate embedding for a single text."""
-        return self.model.encode(text, convert_to_numpy=True)
-    
+        """Generate embedding for a single text (a one-element batch)."""
+        return self.embed_texts([text], batch_size=1, show_progress=False)[0]
+
     def embed_texts(
         self,
         texts: List[str],
-        batch_size: int = 32,
+        batch_size: int = settings.EMBEDDING_BATCH_SIZE,
         show_progress: bool = True,
     ) -> np.ndarray:
-        """Generate embeddings for multiple texts."""
-        embeddings = self.model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=show_progress,
-            convert_to_numpy=True,
-        )
-        
-        logger.info(f"Generated {len(embeddings)} embeddings")
-        return embeddings
-    
+        """
+        Generate embeddings for multiple texts.
+
+        Pass the whole corpus in one call: batches are formed internally from
+        length-sorted texts (sentence-transformers does the same), which keeps
+        padding and per-call overhead low.
+        """
+        if self.doc_model is not None:
+            embeddings = self.doc_model.encode(texts, batch_size, show_progress)
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=batch_size,
+                show_progress_bar=show_progress,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+
+        if show_progress:
+            logger.info(f"Generated {len(embeddings)} embeddings")
+        # FP16 (CUDA) outputs are cast back to the float32 FAISS expects
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Generate embeddings for a batch of queries (with the query encoder)."""
+        if self.query_model is not None:
+            return np.ascontiguousarray(
+                self.query_model.encode(queries, batch_size=len(queries), show_progress=False),
+                dtype=np.float32,
+            )
+        return self.embed_texts(queries, batch_size=len(queries), show_progress=False)
+
     def embed_query(self, query: str) -> np.ndarray:
-        """Generate embedding for a query (same as embed_text, but semantic clarity)."""
-        return self.embed_text(query)
\ No newline at end of file
+        """Generate embedding for a query (a one-element batch)."""
+        return self.embed_queries([query])[0]
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query for cache lookups (lowercase, collapse whitespace)."""
+        return " ".join(query.lower().split())
+
+    def _query_cache_key(self, query: str) -> int:
+        """LRU cache key: 64-bit xxh3 of the normalized query (smaller than the text)."""
+        return xxhash.xxh3_64_intdigest(self.normalize_query(query).encode("utf-8"))
+
+    def get_cached_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Look up a query embedding in the LRU cache."""
+        return self.query_cache.get(self._query_cache_key(query))
+
+    def cache_query_embedding(self, query: str, embedding: np.ndarray) -> None:
+        """Store a query embedding in the LRU cache."""
+        self.query_cache.put(self._query_cache_key(query), embedding)
+
+    def embed_query_cached(self, query: str) -> np.ndarray:
+        """Generate a query embedding, reusing cached results for repeated queries."""
+        embedding = self.get_cached_query_embedding(query)
+        if embedding is None:
+            embedding = self.embed_query(query)
+            self.cache_query_embedding(query, embedding)
+        return embedding
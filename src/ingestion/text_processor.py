@@ -2,7 +2,8 @@
 
 import logging
 import re
-from typing import List
+from typing import List, Set
+import xxhash
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
@@ -11,16 +12,28 @@ from src.config import settings
 logger = logging.getLogger(__name__)
 
 
+def content_hash(text: str) -> int:
+    """Stable 64-bit hash of chunk text (xxh3)."""
+    return xxhash.xxh3_64_intdigest(text.encode("utf-8"))
+
+
 class TextProcessor:
     """Process and chunk text documents."""
     
+    # Precompiled cleaning patterns
+    _BAD_RE = re.compile(r'[^\w\s.,!?;:()\-"]')
+    _WS_RE = re.compile(r'\s+')
+    _DOTS_RE = re.compile(r'\.{2,}')
+    
     def __init__(
         self,
         chunk_size: int = settings.CHUNK_SIZE,
         chunk_overlap: int = settings.CHUNK_OVERLAP,
+        min_chunk_chars: int = settings.MIN_CHUNK_CHARS,
     ):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.min_chunk_chars = min_chunk_chars
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -30,20 +43,30 @@ class TextProcessor:
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize text."""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
         # Remove special characters but keep basic punctuation
-        text = re.sub(r'[^\w\s.,!?;:()\-"]', '', text)
+        text = self._BAD_RE.sub('', text)
+        
+        # Remove extra whitespace (after filtering, so removed characters
+        # don't leave double spaces behind)
+        text = self._WS_RE.sub(' ', text)
         
         # Remove multiple dots
-        text = re.sub(r'\.{2,}', '.', text)
+        text = self._DOTS_RE.sub('.', text)
         
         return text.strip()
     
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into chunks with metadata preservation."""
+        """
+        Split documents into chunks with metadata preservation.
+        
+        Chunks shorter than min_chunk_chars and exact duplicates (by content
+        hash, across all documents in the call) are dropped before they reach
+        the embedder.
+        """
         chunked_docs = []
+        seen_hashes: Set[int] = set()
+        dropped_short = 0
+        dropped_duplicates = 0
         
         for doc in documents:
             # Clean the text
@@ -55,8 +78,21 @@ class TextProcessor:
                 metadata=doc.metadata.copy()
             )
             
-            # Split into chunks
-            chunks = self.text_splitter.split_documents([temp_doc])
+            # Split into chunks, skipping short and duplicate chunks
+            chunks = []
+            for chunk in self.text_splitter.split_documents([temp_doc]):
+                if len(chunk.page_content) < self.min_chunk_chars:
+                    dropped_short += 1
+                    continue
+                
+                chunk_hash = content_hash(chunk.page_content)
+                if chunk_hash in seen_hashes:
+                    dropped_duplicates += 1
+                    continue
+                
+                seen_hashes.add(chunk_hash)
+                chunk.metadata["doc_id"] = chunk_hash
+                chunks.append(chunk)
             
             # Add chunk metadata
             for i, chunk in enumerate(chunks):
@@ -69,7 +105,8 @@ class TextProcessor:
             chunked_docs.extend(chunks)
         
         logger.info(
-            f"Processed {len(documents)} documents into {len(chunked_docs)} chunks"
+            f"Processed {len(documents)} documents into {len(chunked_docs)} chunks "
+            f"(dropped {dropped_short} short, {dropped_duplicates} duplicate)"
         )
         return chunked_docs
     
@@ -0,0 +1,73 @@
+"""Coalescing of concurrent, identical LLM generation requests."""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.llm.generator import LLMGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBatcher:
+    """
+    Share one LLM call between identical requests that are in flight together.
+
+    Requests with the same query, retrieved documents and citation mode get
+    the same answer, so while one is being generated, identical requests
+    await its task instead of making their own call (the LLM cache only fills
+    once the first call completes). Nothing waits on a batching timer: a
+    request with no identical peer goes straight to the generator, whose
+    LLM_MAX_CONCURRENCY semaphore bounds concurrent calls.
+    """
+
+    def __init__(self, generator: LLMGenerator):
+        self.generator = generator
+        self._in_flight: Dict[tuple, asyncio.Task] = {}
+
+    @staticmethod
+    def _group_key(query: str, documents: List[Document], use_citations: bool) -> tuple:
+        """Requests with equal keys get the same answer."""
+        return (query, use_citations, tuple(doc.metadata.get("doc_id") for doc in documents))
+
+    async def submit(
+        self,
+        query: str,
+        context_documents: List[Document],
+        use_citations: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> Dict:
+        """
+        Generate an answer (see LLMGenerator.agenerate), sharing the LLM call
+        with identical requests already in flight.
+        """
+        key = self._group_key(query, context_documents, use_citations)
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.get_running_loop().create_task(
+                self.generator.agenerate(
+                    query,
+                    context_documents,
+                    use_citations=use_citations,
+                    query_embedding=query_embedding,
+                )
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            logger.debug(f"Sharing in-flight LLM call for query: {query[:50]}")
+
+        # Shield: one caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def close(self) -> None:
+        """Cancel in-flight generations."""
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._in_flight.clear()
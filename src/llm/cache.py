@@ -0,0 +1,119 @@
+"""Two-tier LLM response cache: exact prompt match and semantic query match."""
+
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional
+
+import faiss
+import numpy as np
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Cache LLM responses so repeated or paraphrased questions skip the network call.
+
+    - Exact tier: on-disk (diskcache) entries keyed by a SHA256 of the provider,
+      model, temperature, citation mode and full prompt.
+    - Semantic tier: in-memory FAISS inner-product index of past query
+      embeddings, partitioned by scope (provider, model, temperature, citation
+      mode); a hit requires cosine similarity >= similarity_threshold.
+    """
+
+    # Part of every exact key; bump when the cached value layout changes so
+    # entries persisted by older versions are never returned
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        cache_dir: Path = settings.LLM_CACHE_DIR,
+        similarity_threshold: float = settings.LLM_CACHE_SIMILARITY_THRESHOLD,
+        max_semantic_entries: int = settings.LLM_CACHE_MAX_SEMANTIC_ENTRIES,
+    ):
+        import diskcache
+
+        self.exact = diskcache.Cache(str(cache_dir))
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._semantic_indexes: Dict[Hashable, faiss.IndexFlatIP] = {}
+        self._semantic_values: Dict[Hashable, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def exact_key(
+        cls,
+        provider: str,
+        model: str,
+        temperature: float,
+        use_citations: bool,
+        prompt: str,
+    ) -> str:
+        """SHA256 key for an exact prompt match."""
+        raw = f"{cls.FORMAT_VERSION}|{provider}|{model}|{temperature}|{use_citations}|{prompt}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get_exact(self, key: str) -> Optional[dict]:
+        """Look up a response by exact key."""
+        return self.exact.get(key)
+
+    def get_semantic(self, scope: Hashable, query_embedding: np.ndarray) -> Optional[dict]:
+        """Look up the response for the most similar past query in this scope."""
+        with self._lock:
+            index = self._semantic_indexes.get(scope)
+            if index is None or index.ntotal == 0:
+                return None
+
+            scores, ids = index.search(query_embedding.reshape(1, -1), 1)
+            if scores[0][0] >= self.similarity_threshold:
+                return self._semantic_values[scope][ids[0][0]]
+            return None
+
+    def put(
+        self,
+        key: str,
+        scope: Hashable,
+        query_embedding: Optional[np.ndarray],
+        value: dict,
+    ) -> None:
+        """Store a response in both tiers."""
+        self.exact.set(key, value)
+
+        if query_embedding is None:
+            return
+
+        with self._lock:
+            index = self._semantic_indexes.get(scope)
+            if index is None or index.ntotal >= self.max_semantic_entries:
+                # Start the scope over rather than growing without bound
+                if index is not None:
+                    logger.info(f"Semantic LLM cache full ({index.ntotal} entries); resetting")
+                index = self._semantic_indexes[scope] = faiss.IndexFlatIP(len(query_embedding))
+                self._semantic_values[scope] = []
+
+            index.add(query_embedding.reshape(1, -1))
+            self._semantic_values[scope].append(value)
+
+    def clear_semantic(self) -> None:
+        """
+        Drop semantic entries (call when the indexed documents change).
+
+        Exact entries stay valid because their key includes the retrieved context.
+        """
+        with self._lock:
+            self._semantic_indexes.clear()
+            self._semantic_values.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache size statistics."""
+        with self._lock:
+            semantic_entries = sum(index.ntotal for index in self._semantic_indexes.values())
+        return {
+            "exact_entries": len(self.exact),
+            "semantic_entries": semantic_entries,
+            "similarity_threshold": self.similarity_threshold,
+        }
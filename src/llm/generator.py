@@ -1,10 +1,14 @@
 """LLM response generation with OpenAI and Groq support."""
 
+import asyncio
 import logging
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
+import numpy as np
 from langchain_core.documents import Document
 
 from src.config import settings
+from src.ingestion.embedder import Embedder
+from src.llm.cache import ResponseCache
 from src.llm.prompts import PromptTemplates
 
 logger = logging.getLogger(__name__)
@@ -19,19 +23,31 @@ class LLMGenerator:
         model_name: str = settings.LLM_MODEL,
         temperature: float = settings.LLM_TEMPERATURE,
         max_tokens: int = settings.LLM_MAX_TOKENS,
+        embedder: Optional[Embedder] = None,
+        cache: Optional[ResponseCache] = None,
     ):
         self.provider = provider.lower()
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.client = None
+        self.aclient = None  # Async client for agenerate()
+        self._http = None  # Pooled HTTP clients shared by all provider calls
+        self._ahttp = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
         self.prompts = PromptTemplates()
+        self.embedder = embedder  # Embeds queries for semantic cache lookups
+        self.cache = cache
+        if self.cache is None and settings.LLM_CACHE_ENABLED:
+            self.cache = ResponseCache()
         
         # Initialize based on provider
         if self.provider == "groq" and settings.GROQ_API_KEY:
             try:
-                from groq import Groq
-                self.client = Groq(api_key=settings.GROQ_API_KEY)
+                from groq import AsyncGroq, Groq
+                self._create_http_clients()
+                self.client = Groq(api_key=settings.GROQ_API_KEY, http_client=self._http)
+                self.aclient = AsyncGroq(api_key=settings.GROQ_API_KEY, http_client=self._ahttp)
                 logger.info(f"Groq client initialized with model: {model_name}")
             except Exception as e:
                 logger.warning(f"Failed to initialize Groq client: {e}")
@@ -39,8 +55,10 @@ class LLMGenerator:
         
         elif self.provider == "openai" and settings.OPENAI_API_KEY:
             try:
-                from openai import OpenAI
-                self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+                from openai import AsyncOpenAI, OpenAI
+                self._create_http_clients()
+                self.client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=self._http)
+                self.aclient = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=self._ahttp)
                 logger.info(f"OpenAI client initialized with model: {model_name}")
             except Exception as e:
                 logger.warning(f"Failed to initialize OpenAI client: {e}")
@@ -48,46 +66,354 @@ class LLMGenerator:
         else:
             logger.info("No LLM provider configured. Using fallback mode.")
     
+    def _create_http_clients(self) -> None:
+        """
+        Create the sync and async HTTP clients passed to the provider SDKs.
+        
+        Connections are kept alive and pooled across calls (no TLS/TCP setup
+        per request), and HTTP/2 multiplexes concurrent calls over them.
+        """
+        import httpx
+        
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            logger.warning("h2 not installed; using HTTP/1.1. Install with: pip install 'httpx[http2]'")
+            http2 = False
+        
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        )
+        timeout = httpx.Timeout(settings.LLM_HTTP_TIMEOUT)
+        self._http = httpx.Client(http2=http2, limits=limits, timeout=timeout)
+        self._ahttp = httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP clients (call on application shutdown)."""
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+        if self._http is not None:
+            self._http.close()
+    
     def generate(
         self,
         query: str,
         context_documents: List[Document],
         use_citations: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> dict:
         """
         Generate answer using retrieved context.
         
+        Responses are served from the cache when the exact prompt, or a
+        semantically similar query (by embedding), has been answered before
+        with the same provider, model, temperature and citation mode.
+        
+        Args:
+            query: User question
+            context_documents: Retrieved documents to answer from
+            use_citations: Ask the model to cite sources
+            query_embedding: Precomputed query embedding for the semantic
+                cache (embedded with the injected embedder if omitted)
+        
         Returns:
             dict with 'answer', 'sources', and 'model_used'
         """
-        # Format context from documents
-        context = self.prompts.format_context(context_documents)
+        messages = self._build_messages(query, context_documents, use_citations)
         
-        # Generate prompt
-        if use_citations:
-            prompt = self.prompts.rag_prompt_with_citations(query, context)
-        else:
-            prompt = self.prompts.rag_prompt(query, context)
+        # Fallback answers are cheap and not worth caching
+        if not self.client:
+            return self._build_result(
+                self._generate_fallback(query, context_documents), context_documents
+            )
+        
+        scope = self._cache_scope(use_citations)
+        cache_key, cached = self._check_exact_cache(scope, messages)
+        if cached is not None:
+            return cached
+        
+        if query_embedding is None and self.cache is not None and self.embedder is not None:
+            query_embedding = self.embedder.embed_query_cached(query)
+        cached = self._check_semantic_cache(scope, query_embedding)
+        if cached is not None:
+            return cached
         
         # Generate response based on provider
-        if self.client:
-            try:
+        try:
+            if self.provider == "groq":
+                response = self._generate_groq(messages)
+            elif self.provider == "openai":
+                response = self._generate_openai(messages)
+            else:
+                response = self._generate_fallback(query, context_documents)
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            return self._build_result(
+                self._generate_fallback(query, context_documents), context_documents
+            )
+        
+        return self._cache_result(
+            cache_key, scope, query_embedding, self._build_result(response, context_documents)
+        )
+    
+    async def agenerate(
+        self,
+        query: str,
+        context_documents: List[Document],
+        use_citations: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> dict:
+        """
+        Async version of generate() using the async provider clients.
+        
+        Concurrent calls overlap their network I/O; at most
+        LLM_MAX_CONCURRENCY requests are in flight to the provider at once.
+        
+        Returns:
+            dict with 'answer', 'sources', and 'model_used'
+        """
+        messages = self._build_messages(query, context_documents, use_citations)
+        
+        if not self.aclient:
+            return self._build_result(
+                self._generate_fallback(query, context_documents), context_documents
+            )
+        
+        scope = self._cache_scope(use_citations)
+        # The exact-match tier is on disk (SQLite): keep it off the event loop
+        cache_key, cached = await asyncio.to_thread(self._check_exact_cache, scope, messages)
+        if cached is not None:
+            return cached
+        
+        if query_embedding is None and self.cache is not None and self.embedder is not None:
+            query_embedding = await asyncio.to_thread(self.embedder.embed_query_cached, query)
+        cached = self._check_semantic_cache(scope, query_embedding)
+        if cached is not None:
+            return cached
+        
+        try:
+            async with self._get_semaphore():
                 if self.provider == "groq":
-                    response = self._generate_groq(prompt)
-                elif self.provider == "openai":
-                    response = self._generate_openai(prompt)
+                    response = await self._agenerate_groq(messages)
                 else:
-                    response = self._generate_fallback(query, context_documents)
-            except Exception as e:
-                logger.error(f"LLM generation failed: {e}")
-                response = self._generate_fallback(query, context_documents)
-        else:
-            response = self._generate_fallback(query, context_documents)
+                    response = await self._agenerate_openai(messages)
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            return self._build_result(
+                self._generate_fallback(query, context_documents), context_documents
+            )
+        
+        return await asyncio.to_thread(
+            self._cache_result,
+            cache_key, scope, query_embedding, self._build_result(response, context_documents),
+        )
+    
+    async def agenerate_batch(
+        self,
+        queries: List[str],
+        context_documents: List[List[Document]],
+        use_citations: bool = True,
+        query_embeddings: Optional[List[Optional[np.ndarray]]] = None,
+    ) -> List[dict]:
+        """
+        Generate answers for several queries concurrently.
+        
+        Args:
+            queries: User questions
+            context_documents: Retrieved documents for each question
+            use_citations: Ask the model to cite sources
+            query_embeddings: Optional precomputed embedding for each question
+        
+        Returns:
+            One result dict per query, in input order
+        """
+        if query_embeddings is None:
+            query_embeddings = [None] * len(queries)
+        
+        tasks = [
+            self.agenerate(query, docs, use_citations, query_embedding)
+            for query, docs, query_embedding in zip(queries, context_documents, query_embeddings)
+        ]
+        responses = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        results = []
+        for query, docs, response in zip(queries, context_documents, responses):
+            if isinstance(response, Exception):
+                logger.error(f"LLM generation failed: {response}")
+                response = self._build_result(self._generate_fallback(query, docs), docs)
+            results.append(response)
+        return results
+    
+    async def astream(
+        self,
+        query: str,
+        context_documents: List[Document],
+        use_citations: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream an answer as events, token by token.
+        
+        Yields {"event": "token", "data": str} for each piece of the answer,
+        then one {"event": "done", "data": {"sources", "model_used", "cached"}}.
+        Cache hits and fallback answers are sent as a single token event.
+        Completed streams are stored in the response cache like generate().
+        """
+        messages = self._build_messages(query, context_documents, use_citations)
+        
+        if not self.aclient:
+            result = self._build_result(
+                self._generate_fallback(query, context_documents), context_documents
+            )
+            for event in self._result_events(result, cached=False):
+                yield event
+            return
         
-        # Prepare sources
+        scope = self._cache_scope(use_citations)
+        # The exact-match tier is on disk (SQLite): keep it off the event loop
+        cache_key, cached = await asyncio.to_thread(self._check_exact_cache, scope, messages)
+        if cached is None:
+            if query_embedding is None and self.cache is not None and self.embedder is not None:
+                query_embedding = await asyncio.to_thread(self.embedder.embed_query_cached, query)
+            cached = self._check_semantic_cache(scope, query_embedding)
+        if cached is not None:
+            for event in self._result_events(cached, cached=True):
+                yield event
+            return
+        
+        parts = []
+        try:
+            async with self._get_semaphore():
+                stream = (
+                    self._stream_groq(messages) if self.provider == "groq"
+                    else self._stream_openai(messages)
+                )
+                async for token in stream:
+                    parts.append(token)
+                    yield {"event": "token", "data": token}
+        except Exception as e:
+            logger.error(f"LLM streaming failed: {e}")
+            if not parts:
+                result = self._build_result(
+                    self._generate_fallback(query, context_documents), context_documents
+                )
+                for event in self._result_events(result, cached=False):
+                    yield event
+                return
+            # Tokens were already sent: finish without caching the partial answer
+            result = self._build_result("".join(parts), context_documents)
+            yield {"event": "done", "data": self._done_data(result, cached=False)}
+            return
+        
+        result = await asyncio.to_thread(
+            self._cache_result,
+            cache_key, scope, query_embedding,
+            self._build_result("".join(parts), context_documents),
+        )
+        yield {"event": "done", "data": self._done_data(result, cached=False)}
+    
+    @staticmethod
+    def _done_data(result: dict, cached: bool) -> dict:
+        """Payload of the final streaming event."""
+        return {
+            "sources": result["sources"],
+            "model_used": result["model_used"],
+            "cached": cached,
+        }
+    
+    def _result_events(self, result: dict, cached: bool) -> List[dict]:
+        """Streaming events for an answer that is already complete."""
+        return [
+            {"event": "token", "data": result["answer"]},
+            {"event": "done", "data": self._done_data(result, cached)},
+        ]
+    
+    def _build_messages(
+        self,
+        query: str,
+        context_documents: List[Document],
+        use_citations: bool,
+    ) -> List[dict]:
+        """
+        Build the chat messages for a RAG request.
+        
+        The system message is a constant instruction block, so every request
+        shares a byte-identical prefix that providers can serve from their
+        prompt cache; only the user message (context + question) varies.
+        """
+        # Format context from documents
+        context = self.prompts.format_context(context_documents)
+        
+        system = (
+            self.prompts.RAG_CITATIONS_SYSTEM_PROMPT if use_citations
+            else self.prompts.RAG_SYSTEM_PROMPT
+        )
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": self.prompts.rag_user_message(query, context, use_citations)},
+        ]
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the provider concurrency limit (created on the running event loop)."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        return self._semaphore
+    
+    def _cache_scope(self, use_citations: bool) -> Tuple:
+        """Settings a cached response is only valid for."""
+        return (self.provider, self.model_name, self.temperature, use_citations)
+    
+    def _check_exact_cache(
+        self,
+        scope: Tuple,
+        messages: List[dict],
+    ) -> Tuple[Optional[str], Optional[dict]]:
+        """Return the exact cache key and the cached response, if any."""
+        if self.cache is None:
+            return None, None
+        
+        prompt = "\n\n".join(message["content"] for message in messages)
+        cache_key = self.cache.exact_key(*scope, prompt)
+        cached = self.cache.get_exact(cache_key)
+        if cached is not None:
+            logger.info("LLM cache hit (exact)")
+        return cache_key, cached
+    
+    def _check_semantic_cache(
+        self,
+        scope: Tuple,
+        query_embedding: Optional[np.ndarray],
+    ) -> Optional[dict]:
+        """Return the cached response for a similar past query, if any."""
+        if self.cache is None or query_embedding is None:
+            return None
+        
+        cached = self.cache.get_semantic(scope, query_embedding)
+        if cached is not None:
+            logger.info("LLM cache hit (semantic)")
+        return cached
+    
+    def _cache_result(
+        self,
+        cache_key: Optional[str],
+        scope: Tuple,
+        query_embedding: Optional[np.ndarray],
+        result: dict,
+    ) -> dict:
+        """Store a generated response in the cache and return it."""
+        if self.cache is not None:
+            self.cache.put(cache_key, scope, query_embedding, result)
+        return result
+    
+    def _build_result(self, response: str, context_documents: List[Document]) -> dict:
+        """Package an answer with its sources and the model that produced it."""
+        # Prepare sources (references only; the API response model slices
+        # the content snippet at serialization time)
         sources = [
             {
-                "content": doc.page_content[:200] + "...",
+                "page_content": doc.page_content,
                 "metadata": doc.metadata,
             }
             for doc in context_documents
@@ -99,40 +425,78 @@ class LLMGenerator:
             "model_used": f"{self.provider}:{self.model_name}" if self.client else "fallback",
         }
     
-    def _generate_groq(self, prompt: str) -> str:
+    def _generate_groq(self, messages: List[dict]) -> str:
         """Generate response using Groq API."""
         response = self.client.chat.completions.create(
             model=self.model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that answers questions based on provided context. Be concise and accurate."
-                },
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
         )
         
         return response.choices[0].message.content
     
-    def _generate_openai(self, prompt: str) -> str:
+    def _generate_openai(self, messages: List[dict]) -> str:
         """Generate response using OpenAI API."""
         response = self.client.chat.completions.create(
             model=self.model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that answers questions based on provided context."
-                },
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
         )
         
         return response.choices[0].message.content
     
+    async def _agenerate_groq(self, messages: List[dict]) -> str:
+        """Generate response using the async Groq client."""
+        response = await self.aclient.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        
+        return response.choices[0].message.content
+    
+    async def _agenerate_openai(self, messages: List[dict]) -> str:
+        """Generate response using the async OpenAI client."""
+        response = await self.aclient.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        
+        return response.choices[0].message.content
+    
+    async def _stream_groq(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Stream response tokens from the async Groq client."""
+        stream = await self.aclient.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def _stream_openai(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Stream response tokens from the async OpenAI client."""
+        stream = await self.aclient.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def _generate_fallback(
         self,
         query: str,
@@ -159,6 +523,11 @@ class LLMGenerator:
         
         return response
     
+    def clear_cache(self) -> None:
+        """Drop semantic cache entries (call after the indexed documents change)."""
+        if self.cache is not None:
+            self.cache.clear_semantic()
+    
     def is_llm_available(self) -> bool:
         """Check if LLM is properly configured."""
         return self.client is not None
\ No newline at end of file
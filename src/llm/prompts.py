@@ -7,6 +7,23 @@ from langchain_core.documents import Document
 class PromptTemplates:
     """Collection of prompt templates for RAG."""
     
+    # Instruction blocks sent as the system message. They are never
+    # interpolated, so requests share an identical prefix (provider prompt
+    # caching); everything request-specific goes in the user message.
+    RAG_SYSTEM_PROMPT = """You are a helpful AI assistant. Answer the question based ONLY on the provided context.
+
+If the answer cannot be found in the context, say "I don't have enough information to answer this question based on the provided documents."
+
+Be concise and accurate. Include relevant details from the context to support your answer."""
+    
+    RAG_CITATIONS_SYSTEM_PROMPT = """You are a helpful AI assistant. Answer the question based on the provided context.
+
+Instructions:
+1. Answer ONLY using information from the context provided
+2. Cite your sources by mentioning the source number (e.g., "According to Source 1...")
+3. If you cannot find the answer in the context, clearly state this
+4. Be precise and include relevant details"""
+    
     @staticmethod
     def format_context(documents: List[Document]) -> str:
         """Format retrieved documents as context."""
@@ -21,38 +38,25 @@ class PromptTemplates:
         return "\n".join(context_parts)
     
     @staticmethod
-    def rag_prompt(query: str, context: str) -> str:
-        """Generate RAG prompt with context and query."""
-        return f"""You are a helpful AI assistant. Answer the question based ONLY on the provided context. 
-
-If the answer cannot be found in the context, say "I don't have enough information to answer this question based on the provided documents."
-
-Be concise and accurate. Include relevant details from the context to support your answer.
-
-CONTEXT:
+    def rag_user_message(query: str, context: str, use_citations: bool = True) -> str:
+        """Generate the request-specific part of a RAG prompt (context and query)."""
+        answer_label = "ANSWER (with citations):" if use_citations else "ANSWER:"
+        return f"""CONTEXT:
 {context}
 
 QUESTION: {query}
 
-ANSWER:"""
+{answer_label}"""
     
-    @staticmethod
-    def rag_prompt_with_citations(query: str, context: str) -> str:
+    @classmethod
+    def rag_prompt(cls, query: str, context: str) -> str:
+        """Generate RAG prompt with context and query."""
+        return f"{cls.RAG_SYSTEM_PROMPT}\n\n{cls.rag_user_message(query, context, use_citations=False)}"
+    
+    @classmethod
+    def rag_prompt_with_citations(cls, query: str, context: str) -> str:
         """Generate RAG prompt that encourages citations."""
-        return f"""You are a helpful AI assistant. Answer the question based on the provided context.
-
-Instructions:
-1. Answer ONLY using information from the context provided
-2. Cite your sources by mentioning the source number (e.g., "According to Source 1...")
-3. If you cannot find the answer in the context, clearly state this
-4. Be precise and include relevant details
-
-CONTEXT:
-{context}
-
-QUESTION: {query}
-
-ANSWER (with citations):"""
+        return f"{cls.RAG_CITATIONS_SYSTEM_PROMPT}\n\n{cls.rag_user_message(query, context)}"
     
     @staticmethod
     def conversational_rag_prompt(
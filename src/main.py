@@ -25,10 +25,20 @@ async def lifespan(app: FastAPI):
     rag_system = get_rag_system()
     logger.info(f"RAG system ready with {rag_system.vector_store.get_stats()['total_vectors']} vectors")
     
+    # Warm up models and kernels before accepting traffic
+    if settings.WARMUP_ON_STARTUP:
+        rag_system.warmup()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down RAG application...")
+    await rag_system.batching_embedder.close()
+    await rag_system.llm_batcher.close()
+    await rag_system.generator.aclose()
+    rag_system.embedding_executor.shutdown(wait=False)
+    rag_system.search_executor.shutdown(wait=False)
+    
     # Save indexes on shutdown
     try:
         rag_system.save_indexes()
@@ -0,0 +1,168 @@
+"""BM25 (Okapi) scoring over CSR postings with a Numba kernel."""
+
+import logging
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, types
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    def _array(dtype, readonly: bool = False):
+        return types.Array(dtype, 1, "A", readonly=readonly)
+
+    # An explicit signature compiles the kernel eagerly at import (no compile
+    # on the first query), and cache=True persists the machine code in
+    # __pycache__ so restarts only load it. Postings are typed read-only so
+    # one signature accepts both in-memory arrays (writable arrays coerce to
+    # read-only) and the read-only memory maps from KeywordSearch.load; two
+    # signatures would make writable arguments ambiguous.
+    _BM25_SIGNATURE = types.void(
+        _array(types.int64),  # query_term_ids
+        _array(types.int64, readonly=True),  # ptrs
+        _array(types.int64, readonly=True),  # doc_ids
+        _array(types.float32, readonly=True),  # tfs
+        _array(types.float32, readonly=True),  # idf
+        _array(types.float32, readonly=True),  # doc_lens
+        types.float64,  # avgdl
+        types.float64,  # k1
+        types.float64,  # b
+        _array(types.float32),  # scores
+    )
+
+    # Serial on purpose: queries already run concurrently on the search pool
+    # (one core each), and nogil lets those threads score in parallel
+    @njit(_BM25_SIGNATURE, fastmath=True, nogil=True, cache=True)
+    def _bm25_scores(query_term_ids, ptrs, doc_ids, tfs, idf, doc_lens, avgdl, k1, b, scores):
+        """Add the BM25 contribution of each query term to scores (in place)."""
+        for t in range(len(query_term_ids)):
+            term = query_term_ids[t]
+            term_idf = idf[term]
+            for j in range(ptrs[term], ptrs[term + 1]):
+                doc = doc_ids[j]
+                tf = tfs[j]
+                norm = k1 * (1.0 - b + b * doc_lens[doc] / avgdl)
+                scores[doc] += term_idf * tf * (k1 + 1.0) / (tf + norm)
+
+
+class BM25Index:
+    """
+    BM25 statistics stored as CSR postings: for term id t, the documents
+    containing it are doc_ids[ptrs[t]:ptrs[t + 1]] with frequencies tfs[...].
+
+    IDF and parameters match rank_bm25.BM25Okapi, so scores are the same as
+    BM25Okapi.get_scores (up to float32 rounding). Scoring only reads the
+    arrays, so they may be read-only memory maps.
+    """
+
+    ARRAY_NAMES = ("ptrs", "doc_ids", "tfs", "idf", "doc_lens")
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        ptrs: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        idf: np.ndarray,
+        doc_lens: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.vocab = vocab  # May be shared and grow; only the first num_terms ids are indexed
+        self.num_terms = len(ptrs) - 1
+        self.ptrs = ptrs
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.doc_lens = doc_lens
+        self.avgdl = float(doc_lens.mean()) if len(doc_lens) else 0.0
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def from_tokens(
+        cls,
+        tokens: np.ndarray,
+        token_offsets: np.ndarray,
+        vocab: Dict[str, int],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "BM25Index":
+        """
+        Build postings and IDF from a flat token array (see Corpus).
+
+        The tokens of document i are tokens[token_offsets[i]:token_offsets[i + 1]],
+        as ids into vocab.
+        """
+        num_docs = len(token_offsets) - 1
+        num_terms = len(vocab)
+        doc_tokens = np.diff(token_offsets)
+
+        # One posting per distinct (term, doc) pair; sorting the combined
+        # key groups postings by term with doc ids ascending
+        stride = max(num_docs, 1)
+        token_docs = np.repeat(np.arange(num_docs, dtype=np.int64), doc_tokens)
+        keys = np.asarray(tokens, dtype=np.int64) * stride + token_docs
+        pair_keys, tfs = np.unique(keys, return_counts=True)
+        term_ids = pair_keys // stride
+        doc_freqs = np.bincount(term_ids, minlength=num_terms)
+        ptrs = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=ptrs[1:])
+
+        # Okapi IDF; negative values (terms in over half the corpus) are
+        # floored at epsilon * mean IDF, as rank_bm25 does
+        idf = np.log(num_docs - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+
+        return cls(
+            vocab=vocab,
+            ptrs=ptrs,
+            doc_ids=pair_keys % stride,
+            tfs=tfs.astype(np.float32),
+            idf=idf.astype(np.float32),
+            doc_lens=doc_tokens.astype(np.float32),
+            k1=k1,
+            b=b,
+        )
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """BM25 score of every document for the query tokens."""
+        scores = np.zeros(len(self.doc_lens), dtype=np.float32)
+        # Repeated query tokens count once per occurrence, as in rank_bm25
+        query_term_ids = np.array(
+            [
+                term for term in (self.vocab.get(token) for token in query_tokens)
+                if term is not None and term < self.num_terms
+            ],
+            dtype=np.int64,
+        )
+        if len(query_term_ids):
+            _bm25_scores(
+                query_term_ids, self.ptrs, self.doc_ids, self.tfs, self.idf,
+                self.doc_lens, self.avgdl, self.k1, self.b, scores,
+            )
+        return scores
+
+    def get_state(self) -> dict:
+        """Parameters needed to restore the index (see from_state)."""
+        return {"k1": self.k1, "b": self.b}
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """Postings and statistics arrays, by name (see ARRAY_NAMES)."""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_state(
+        cls, state: dict, arrays: Dict[str, np.ndarray], vocab: Dict[str, int]
+    ) -> "BM25Index":
+        """Restore an index from get_state() and get_arrays() output."""
+        return cls(vocab=vocab, **state, **arrays)
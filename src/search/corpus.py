@@ -0,0 +1,152 @@
+"""Column-oriented chunk corpus shared by the vector and keyword indexes."""
+
+import logging
+import multiprocessing
+import re
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.ingestion.document_loader import default_worker_count
+from src.ingestion.text_processor import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Word characters, keeping internal apostrophes ("don't"); replaces the old
+# split-and-strip tokenizer. Bump TOKENIZER_VERSION whenever tokens change so
+# saved indexes are rebuilt instead of mixing old and new tokens.
+_TOKEN_RE = re.compile(r"\w+(?:'\w+)*")
+TOKENIZER_VERSION = 2
+
+# Corpora at least this large are tokenized across worker processes
+PARALLEL_TOKENIZE_MIN_DOCS = 20000
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into word tokens (module-level so it pickles)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def tokenize_texts(texts: List[str]) -> List[List[str]]:
+    """Tokenize texts, in parallel for large corpora."""
+    workers = min(default_worker_count(), len(texts))
+
+    if workers > 1 and len(texts) >= PARALLEL_TOKENIZE_MIN_DOCS:
+        logger.info(f"Tokenizing {len(texts)} documents with {workers} worker processes")
+        # Spawn, not fork: this also runs inside the API server, where forking
+        # a process with ONNX Runtime/OpenMP/executor threads can deadlock
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            return pool.map(tokenize, texts, chunksize=1000)
+
+    return [tokenize(text) for text in texts]
+
+
+class Corpus:
+    """
+    Indexed chunks stored as parallel columns (structure of arrays).
+
+    Row i is the chunk at position i in both the FAISS index and the BM25
+    index, so each chunk's text is held once. Tokens are interned into a
+    vocabulary and kept as one flat int32 array: the tokens of row i are
+    tokens[token_offsets[i]:token_offsets[i + 1]]. Document objects are only
+    built for the rows a search returns (see document()).
+
+    The corpus has a single writer: callers add chunks here, then bring the
+    indexes up to date (VectorStore.update, KeywordSearch.update).
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        """Remove every row and the vocabulary."""
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []  # Inverse of vocab
+        self.tokens = np.empty(0, dtype=np.int32)
+        self.token_offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def num_tokenized(self) -> int:
+        """Number of leading rows whose tokens are stored."""
+        return len(self.token_offsets) - 1
+
+    def add(self, texts: List[str], metadatas: List[dict]) -> None:
+        """
+        Append rows.
+
+        Rows without a doc_id (e.g. from indexes saved by older versions)
+        get the content hash of their text, as chunking assigns.
+        """
+        for text, metadata in zip(texts, metadatas):
+            if "doc_id" not in metadata:
+                metadata["doc_id"] = content_hash(text)
+
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+
+    def add_documents(self, documents: List[Document]) -> None:
+        """Append the text and metadata of each document as a row."""
+        self.add(
+            [doc.page_content for doc in documents],
+            [doc.metadata for doc in documents],
+        )
+
+    def document(self, row: int) -> Document:
+        """Build the Document for a row."""
+        return Document(page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def tokenize(self) -> None:
+        """Tokenize and intern the rows added since the last call."""
+        start = self.num_tokenized
+        if start == len(self.texts):
+            return
+
+        token_lists = tokenize_texts(self.texts[start:])
+        vocab, terms = self.vocab, self.terms
+
+        def intern(token: str) -> int:
+            term = vocab.get(token)
+            if term is None:
+                term = vocab[token] = len(terms)
+                terms.append(token)
+            return term
+
+        new_tokens = np.fromiter(
+            (intern(token) for tokens in token_lists for token in tokens), dtype=np.int32
+        )
+        lengths = np.fromiter(
+            (len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists)
+        )
+
+        # Tokens first: readers bound their slices by token_offsets
+        self.tokens = np.concatenate([self.tokens, new_tokens])
+        self.token_offsets = np.concatenate(
+            [self.token_offsets, self.token_offsets[-1] + np.cumsum(lengths)]
+        )
+
+    def set_tokens(self, terms: List[str], tokens: np.ndarray, token_offsets: np.ndarray) -> None:
+        """Restore tokens saved by an index (see KeywordSearch.save)."""
+        if len(token_offsets) - 1 != len(self.texts):
+            raise ValueError(
+                f"Saved tokens cover {len(token_offsets) - 1} rows, "
+                f"corpus has {len(self.texts)}"
+            )
+
+        self.terms = list(terms)
+        self.vocab = {term: i for i, term in enumerate(self.terms)}
+        self.tokens = tokens
+        self.token_offsets = token_offsets
+
+    def token_lists(self) -> List[List[str]]:
+        """Tokens of each tokenized row as strings (for rank_bm25)."""
+        terms, tokens, offsets = self.terms, self.tokens, self.token_offsets
+        return [
+            [terms[term] for term in tokens[offsets[i]:offsets[i + 1]]]
+            for i in range(self.num_tokenized)
+        ]
@@ -1,9 +1,13 @@
 """Hybrid search combining vector and keyword search."""
 
+import asyncio
 import logging
-from typing import List, Tuple, Dict
+from concurrent.futures import Executor
+from typing import List, Tuple, Dict, Optional
+import numpy as np
 from langchain_core.documents import Document
 
+from src.cache import StatsLRUCache
 from src.config import settings
 from src.search.vector_store import VectorStore
 from src.search.keyword_search import KeywordSearch
@@ -20,62 +24,126 @@ class HybridSearch:
         keyword_search: KeywordSearch,
         vector_weight: float = settings.VECTOR_WEIGHT,
         keyword_weight: float = settings.KEYWORD_WEIGHT,
+        executor: Optional[Executor] = None,
     ):
         self.vector_store = vector_store
         self.keyword_search = keyword_search
         self.vector_weight = vector_weight
         self.keyword_weight = keyword_weight
+        self.executor = executor  # Runs asearch() work off the event loop (None: default pool)
+        self.results_cache = StatsLRUCache(maxsize=settings.SEARCH_CACHE_SIZE)
+    
+    def _cache_key(self, query: str, top_k: int, use_rrf: bool) -> tuple:
+        """Cache key for a search request."""
+        return (" ".join(query.lower().split()), top_k, use_rrf)
+    
+    def get_cached(
+        self,
+        query: str,
+        top_k: int = settings.HYBRID_TOP_K,
+        use_rrf: bool = True,
+    ) -> Optional[List[Tuple[Document, float]]]:
+        """Return cached results for a search request, or None."""
+        return self.results_cache.get(self._cache_key(query, top_k, use_rrf))
+    
+    def clear_cache(self) -> None:
+        """Invalidate cached search results (call after the indexes change)."""
+        self.results_cache.clear()
     
     def _reciprocal_rank_fusion(
         self,
         vector_results: List[Tuple[Document, float]],
         keyword_results: List[Tuple[Document, float]],
         k: int = 60,
+        top_k: Optional[int] = None,
     ) -> List[Tuple[Document, float]]:
         """
         Combine results using Reciprocal Rank Fusion.
         
         RRF formula: score(d) = Σ 1/(k + rank(d))
         where k is a constant (default 60) and rank is the position in the list.
+        
+        Scores are accumulated in a NumPy array indexed by row (one row per
+        distinct doc_id), and only the top_k rows are sorted.
         """
-        # Create document ID mapping (using content hash as ID)
-        doc_scores: Dict[str, float] = {}
-        doc_objects: Dict[str, Document] = {}
-        
-        # Process vector results
-        for rank, (doc, score) in enumerate(vector_results, start=1):
-            doc_id = hash(doc.page_content)
-            rrf_score = self.vector_weight / (k + rank)
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + rrf_score
-            doc_objects[doc_id] = doc
-        
-        # Process keyword results
-        for rank, (doc, score) in enumerate(keyword_results, start=1):
-            doc_id = hash(doc.page_content)
-            rrf_score = self.keyword_weight / (k + rank)
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + rrf_score
-            doc_objects[doc_id] = doc
-        
-        # Sort by combined score
-        sorted_docs = sorted(
-            doc_scores.items(),
-            key=lambda x: x[1],
-            reverse=True
+        (rows_v, rows_k), doc_objects = self._assign_rows(vector_results, keyword_results)
+        
+        # Accumulate weighted reciprocal ranks for both lists
+        scores = np.zeros(len(doc_objects), dtype=np.float64)
+        np.add.at(scores, rows_v, self.vector_weight / (k + np.arange(1, len(rows_v) + 1)))
+        np.add.at(scores, rows_k, self.keyword_weight / (k + np.arange(1, len(rows_k) + 1)))
+        
+        return [
+            (doc_objects[row], float(scores[row]))
+            for row in self._top_rows(scores, top_k)
+        ]
+    
+    def _weighted_combination(
+        self,
+        vector_results: List[Tuple[Document, float]],
+        keyword_results: List[Tuple[Document, float]],
+        top_k: Optional[int] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Combine results by the weighted sum of their vector and keyword scores."""
+        (rows_v, rows_k), doc_objects = self._assign_rows(vector_results, keyword_results)
+        
+        scores = np.zeros(len(doc_objects), dtype=np.float64)
+        np.add.at(
+            scores, rows_v,
+            self.vector_weight * np.array([score for _, score in vector_results], dtype=np.float64),
+        )
+        np.add.at(
+            scores, rows_k,
+            self.keyword_weight * np.array([score for _, score in keyword_results], dtype=np.float64),
         )
         
-        # Create final results
-        results = [
-            (doc_objects[doc_id], score)
-            for doc_id, score in sorted_docs
+        return [
+            (doc_objects[row], float(scores[row]))
+            for row in self._top_rows(scores, top_k)
         ]
+    
+    @staticmethod
+    def _assign_rows(
+        *result_lists: List[Tuple[Document, float]],
+    ) -> Tuple[List[np.ndarray], List[Document]]:
+        """
+        Map each distinct doc_id (assigned at index time) to a score row.
         
-        return results
+        Returns:
+            (row indices for each result list, document for each row)
+        """
+        doc_rows: Dict[int, int] = {}
+        doc_objects: List[Document] = []
+        all_rows = []
+        
+        for results in result_lists:
+            rows = np.empty(len(results), dtype=np.int64)
+            for i, (doc, _) in enumerate(results):
+                doc_id = doc.metadata["doc_id"]
+                row = doc_rows.get(doc_id)
+                if row is None:
+                    row = doc_rows[doc_id] = len(doc_objects)
+                    doc_objects.append(doc)
+                rows[i] = row
+            all_rows.append(rows)
+        
+        return all_rows, doc_objects
+    
+    @staticmethod
+    def _top_rows(scores: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+        """Rows of the top-k scores, best first (O(N) selection, then sort k)."""
+        if top_k is not None and top_k < len(scores):
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
     
     def search(
         self,
         query: str,
         top_k: int = settings.HYBRID_TOP_K,
         use_rrf: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> List[Tuple[Document, float]]:
         """
         Perform hybrid search combining vector and keyword search.
@@ -84,13 +152,27 @@ class HybridSearch:
             query: Search query
             top_k: Number of results to return
             use_rrf: Use Reciprocal Rank Fusion (True) or simple weighted combination
+            query_embedding: Precomputed query embedding (computed if not given).
+                Callers that embed the query themselves should check
+                get_cached() first; the cache is not consulted again here.
         
         Returns:
             List of (Document, score) tuples
         """
+        cache_key = self._cache_key(query, top_k, use_rrf)
+        if query_embedding is None:
+            cached = self.results_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Embed the query once (LRU-cached); callers reuse the same vector
+        # for the LLM semantic cache
+        if query_embedding is None:
+            query_embedding = self.vector_store.embedder.embed_query_cached(query)
+        
         # Perform both searches
-        vector_results = self.vector_store.search(
-            query, top_k=settings.VECTOR_TOP_K
+        vector_results = self.vector_store.search_by_embedding(
+            query_embedding, top_k=settings.VECTOR_TOP_K
         )
         keyword_results = self.keyword_search.search(
             query, top_k=settings.KEYWORD_TOP_K
@@ -101,35 +183,66 @@ class HybridSearch:
             f"Keyword search: {len(keyword_results)} results"
         )
         
-        # Combine results
-        if use_rrf:
-            combined_results = self._reciprocal_rank_fusion(
-                vector_results, keyword_results
+        results = self._combine(vector_results, keyword_results, top_k, use_rrf)
+        self.results_cache.put(cache_key, results)
+        return results
+    
+    async def asearch(
+        self,
+        query: str,
+        top_k: int = settings.HYBRID_TOP_K,
+        use_rrf: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Async version of search() that runs vector and keyword search concurrently.
+        
+        Both searches run in the search executor (FAISS and the nogil BM25
+        kernel release the GIL), so retrieval takes about as long as the slower
+        of the two and never blocks the event loop. Takes the same arguments
+        as search().
+        """
+        cache_key = self._cache_key(query, top_k, use_rrf)
+        if query_embedding is None:
+            cached = self.results_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Without a precomputed embedding, the query is embedded in the
+        # vector search thread, overlapping with BM25 scoring
+        loop = asyncio.get_running_loop()
+        if query_embedding is None:
+            vector_task = loop.run_in_executor(
+                self.executor, self.vector_store.search, query, settings.VECTOR_TOP_K
             )
         else:
-            # Simple weighted combination
-            doc_scores: Dict[str, Tuple[Document, float]] = {}
-            
-            for doc, score in vector_results:
-                doc_id = hash(doc.page_content)
-                doc_scores[doc_id] = (doc, score * self.vector_weight)
-            
-            for doc, score in keyword_results:
-                doc_id = hash(doc.page_content)
-                if doc_id in doc_scores:
-                    existing_doc, existing_score = doc_scores[doc_id]
-                    doc_scores[doc_id] = (
-                        existing_doc,
-                        existing_score + score * self.keyword_weight
-                    )
-                else:
-                    doc_scores[doc_id] = (doc, score * self.keyword_weight)
-            
-            combined_results = sorted(
-                doc_scores.values(),
-                key=lambda x: x[1],
-                reverse=True
+            vector_task = loop.run_in_executor(
+                self.executor, self.vector_store.search_by_embedding,
+                query_embedding, settings.VECTOR_TOP_K,
             )
+        keyword_task = loop.run_in_executor(
+            self.executor, self.keyword_search.search, query, settings.KEYWORD_TOP_K
+        )
+        vector_results, keyword_results = await asyncio.gather(vector_task, keyword_task)
         
-        # Return top-k results
-        return combined_results[:top_k]
\ No newline at end of file
+        logger.info(
+            f"Vector search: {len(vector_results)} results, "
+            f"Keyword search: {len(keyword_results)} results"
+        )
+        
+        results = self._combine(vector_results, keyword_results, top_k, use_rrf)
+        self.results_cache.put(cache_key, results)
+        return results
+    
+    def _combine(
+        self,
+        vector_results: List[Tuple[Document, float]],
+        keyword_results: List[Tuple[Document, float]],
+        top_k: int,
+        use_rrf: bool,
+    ) -> List[Tuple[Document, float]]:
+        """Fuse vector and keyword results and return the top-k."""
+        # Combine results
+        if use_rrf:
+            return self._reciprocal_rank_fusion(vector_results, keyword_results, top_k=top_k)
+        return self._weighted_combination(vector_results, keyword_results, top_k=top_k)
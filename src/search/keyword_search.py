@@ -1,51 +1,98 @@
 """BM25 keyword-based search."""
 
 import logging
-from typing import List, Tuple
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
 from rank_bm25 import BM25Okapi
 from langchain_core.documents import Document
 
 from src.config import settings
+from src.search.bm25 import BM25Index, NUMBA_AVAILABLE
+from src.search.corpus import Corpus, TOKENIZER_VERSION, tokenize
 
 logger = logging.getLogger(__name__)
 
+# Corpus token arrays saved next to the BM25 state (see _array_path)
+CORPUS_ARRAY_NAMES = ("tokens", "token_offsets")
+
 
 class KeywordSearch:
-    """BM25-based keyword search engine."""
+    """
+    BM25-based keyword search engine over a shared Corpus.
+    
+    Scores with the Numba BM25 kernel over CSR postings (BM25Index) when
+    numba is installed, and with rank_bm25 otherwise.
+    """
     
-    def __init__(self):
-        self.bm25: BM25Okapi = None
-        self.documents: List[Document] = []
-        self.tokenized_corpus: List[List[str]] = []
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
+        self.index: Optional[BM25Index] = None
+        self.bm25: Optional[BM25Okapi] = None  # Fallback without numba
+        self._dirty = False  # Rows added since the BM25 index was built
+        self._rebuild_lock = threading.Lock()  # Searches run on several threads
     
     def _tokenize(self, text: str) -> List[str]:
         """Simple tokenization (can be enhanced with nltk/spacy)."""
-        # Convert to lowercase and split
-        tokens = text.lower().split()
-        
-        # Remove punctuation
-        tokens = [token.strip('.,!?;:()[]{}"\'-') for token in tokens]
-        
-        # Filter out empty tokens
-        tokens = [token for token in tokens if token]
+        return tokenize(text)
+    
+    def build_index(self) -> None:
+        """Build BM25 index over every corpus row."""
+        logger.info(f"Building BM25 index for {len(self.corpus)} documents...")
         
-        return tokens
+        # Tokenize rows not tokenized yet, then build BM25 index
+        with self._rebuild_lock:
+            self._rebuild()
     
-    def build_index(self, documents: List[Document]) -> None:
-        """Build BM25 index from documents."""
-        logger.info(f"Building BM25 index for {len(documents)} documents...")
+    def update(self) -> None:
+        """
+        Index rows added to the corpus since the last build or update.
         
-        self.documents = documents
+        Only the new rows are tokenized; BM25 statistics depend on the
+        whole corpus, so the index is marked dirty and rebuilt lazily on the
+        next search.
+        """
+        added = len(self.corpus) - self.corpus.num_tokenized
+        if added == 0:
+            return
         
-        # Tokenize all documents
-        self.tokenized_corpus = [
-            self._tokenize(doc.page_content) for doc in documents
-        ]
+        # A search rebuilding a dirty index tokenizes too (see _rebuild)
+        with self._rebuild_lock:
+            self.corpus.tokenize()
+            self._dirty = True
         
-        # Build BM25 index
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+        logger.info(f"Added {added} documents to BM25 corpus (rebuild pending)")
+    
+    def _ensure_built(self) -> None:
+        """Rebuild a dirty index once, even when several searches find it dirty."""
+        if self._dirty:
+            with self._rebuild_lock:
+                if self._dirty:
+                    self._rebuild()
+    
+    def _rebuild(self) -> None:
+        """Rebuild BM25 statistics from the corpus tokens (hold _rebuild_lock)."""
+        self.corpus.tokenize()
+        index = None
+        bm25 = None
+        if self.corpus.num_tokenized:
+            if NUMBA_AVAILABLE:
+                index = BM25Index.from_tokens(
+                    self.corpus.tokens, self.corpus.token_offsets, self.corpus.vocab
+                )
+            else:
+                bm25 = BM25Okapi(self.corpus.token_lists())
         
-        logger.info(f"BM25 index built with {len(self.documents)} documents")
+        # Swap in the new index only once it is complete, so concurrent
+        # searches keep using the old one meanwhile
+        self.index = index
+        self.bm25 = bm25
+        self._dirty = False
+        
+        logger.info(f"BM25 index built with {self.corpus.num_tokenized} documents")
     
     def search(
         self,
@@ -53,7 +100,11 @@ class KeywordSearch:
         top_k: int = settings.KEYWORD_TOP_K,
     ) -> List[Tuple[Document, float]]:
         """Search for documents using BM25."""
-        if not self.bm25:
+        self._ensure_built()
+        
+        # Read each once: another thread may swap in a rebuilt index
+        index, bm25 = self.index, self.bm25
+        if index is None and bm25 is None:
             logger.warning("BM25 index not built")
             return []
         
@@ -61,27 +112,143 @@ class KeywordSearch:
         tokenized_query = self._tokenize(query)
         
         # Get BM25 scores
-        scores = self.bm25.get_scores(tokenized_query)
+        if index is not None:
+            scores = index.get_scores(tokenized_query)
+        else:
+            scores = bm25.get_scores(tokenized_query)
+        
+        # No matching terms: nothing to rank
+        if len(scores) == 0 or scores.max() <= 0:
+            return []
         
-        # Get top-k indices
-        top_indices = scores.argsort()[-top_k:][::-1]
+        # Get top-k indices (O(N) selection, then sort only the top-k)
+        if top_k < len(scores):
+            top_indices = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            top_indices = np.arange(len(scores))
+        top_indices = top_indices[np.argsort(-scores[top_indices], kind="stable")]
         
-        # Prepare results
+        # Prepare results (Documents are built only for the top-k rows). Only
+        # non-zero scores count, and rows must still exist: the corpus may have
+        # been cleared since the index was read
         results = []
         for idx in top_indices:
             score = float(scores[idx])
-            if score > 0:  # Only include documents with non-zero scores
-                results.append((self.documents[idx], score))
+            if score > 0 and 0 <= idx < len(self.corpus):
+                results.append((self.corpus.document(int(idx)), score))
         
         return results
     
+    def warmup(self) -> None:
+        """Score one indexed term (runs the compiled kernel once and pages in the postings)."""
+        self._ensure_built()
+        
+        index = self.index
+        if index is not None and index.vocab:
+            index.get_scores([next(iter(index.vocab))])
+    
+    def save(self, path: Path) -> None:
+        """
+        Save the corpus tokens and BM25 statistics to disk.
+        
+        The corpus token arrays and BM25Index postings arrays are written as
+        .npy files next to `path` (see _array_path) so load() can memory-map
+        them. Every file is written to a temporary name and renamed into
+        place, so a crash never leaves a partially written index behind (and
+        arrays mapped from the old files stay valid).
+        """
+        self._ensure_built()
+        
+        arrays = {name: getattr(self.corpus, name) for name in CORPUS_ARRAY_NAMES}
+        if self.index is not None:
+            arrays.update(self.index.get_arrays())
+        for name, array in arrays.items():
+            array_path = self._array_path(path, name)
+            tmp_path = array_path.with_name(array_path.name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, array_path)
+        
+        state = {
+            "tokenizer_version": TOKENIZER_VERSION,
+            "terms": self.corpus.terms,
+            "index": self.index.get_state() if self.index is not None else None,
+            "bm25": None,
+        }
+        if self.bm25 is not None:
+            state["bm25"] = {
+                "corpus_size": self.bm25.corpus_size,
+                "idf": self.bm25.idf,
+                "doc_freqs": self.bm25.doc_freqs,
+                "doc_len": self.bm25.doc_len,
+                "avgdl": self.bm25.avgdl,
+                "k1": self.bm25.k1,
+                "b": self.bm25.b,
+                "epsilon": self.bm25.epsilon,
+            }
+        
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        
+        logger.info(f"BM25 index saved to {path}")
+    
+    @staticmethod
+    def _array_path(path: Path, name: str) -> Path:
+        """Path of a saved array stored next to the state file."""
+        return path.with_name(f"{path.stem}_{name}.npy")
+    
+    def load(self, path: Path) -> None:
+        """
+        Load corpus tokens and BM25 state saved by save() without re-tokenizing.
+        
+        The corpus rows must already be loaded (VectorStore.load). Token and
+        postings arrays are memory-mapped read-only: pages are read on first
+        use and shared through the page cache by all worker processes.
+        """
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        
+        if state.get("tokenizer_version") != TOKENIZER_VERSION:
+            raise ValueError("BM25 index was saved with a different tokenizer")
+        if "terms" not in state:
+            raise ValueError("BM25 index was saved in an older format")
+        
+        self.corpus.set_tokens(
+            state["terms"],
+            *(np.load(self._array_path(path, name), mmap_mode="r") for name in CORPUS_ARRAY_NAMES),
+        )
+        self.index = None
+        self.bm25 = None
+        self._dirty = False
+        
+        if NUMBA_AVAILABLE and state.get("index") is not None:
+            arrays = {
+                name: np.load(self._array_path(path, name), mmap_mode="r")
+                for name in BM25Index.ARRAY_NAMES
+            }
+            self.index = BM25Index.from_state(state["index"], arrays, self.corpus.vocab)
+        elif not NUMBA_AVAILABLE and state.get("bm25") is not None:
+            # Restore statistics directly instead of calling BM25Okapi.__init__
+            self.bm25 = BM25Okapi.__new__(BM25Okapi)
+            self.bm25.tokenizer = None
+            for name, value in state["bm25"].items():
+                setattr(self.bm25, name, value)
+        elif self.corpus.num_tokenized:
+            # Saved for the other scorer (or by an older version): rebuild
+            # from the stored tokens, which is still cheaper than re-tokenizing
+            with self._rebuild_lock:
+                self._rebuild()
+        
+        logger.info(f"BM25 index loaded from {path} ({self.corpus.num_tokenized} documents)")
+    
     def get_stats(self) -> dict:
         """Get keyword search statistics."""
         return {
-            "total_documents": len(self.documents),
+            "total_documents": self.corpus.num_tokenized,
             "avg_tokens_per_doc": (
-                sum(len(tokens) for tokens in self.tokenized_corpus) 
-                // len(self.tokenized_corpus)
-                if self.tokenized_corpus else 0
+                len(self.corpus.tokens) // self.corpus.num_tokenized
+                if self.corpus.num_tokenized else 0
             ),
         }
\ No newline at end of file
@@ -1,106 +1,430 @@
 """FAISS vector store for similarity search."""
 
+import json
 import logging
+import math
+import os
 import pickle
+import shutil
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 import numpy as np
 import faiss
+import pyarrow as pa
+import pyarrow.parquet as pq
 from langchain_core.documents import Document
 
 from src.config import settings
 from src.ingestion.embedder import Embedder
+from src.search.corpus import Corpus
 
 logger = logging.getLogger(__name__)
 
+# Metadata keys stored as their own Parquet columns; any other metadata
+# is kept as a JSON string in the "extra_metadata" column.
+METADATA_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("file_name", pa.string()),
+    ("file_type", pa.string()),
+    ("loaded_at", pa.string()),
+    ("chunk_id", pa.int64()),
+    ("page_content", pa.string()),
+    ("extra_metadata", pa.string()),
+])
+METADATA_COLUMNS = ("source", "file_name", "file_type", "loaded_at", "chunk_id")
+
+
+def gpu_available() -> bool:
+    """Check whether FAISS GPU support is enabled and a GPU is present."""
+    get_num_gpus = getattr(faiss, "get_num_gpus", None)
+    return settings.FAISS_USE_GPU and get_num_gpus is not None and get_num_gpus() > 0
+
 
 class VectorStore:
-    """FAISS-based vector store for document retrieval."""
+    """FAISS-based vector store for document retrieval (vector i is corpus row i)."""
     
-    def __init__(self, embedder: Embedder):
+    def __init__(self, embedder: Embedder, corpus: Corpus):
         self.embedder = embedder
         self.dimension = embedder.embedding_dim
         self.index: Optional[faiss.Index] = None
-        self.documents: List[Document] = []
-        self.doc_embeddings: Optional[np.ndarray] = None
+        self.corpus = corpus
+        self._mmap_index_path: Optional[Path] = None  # Set while the index is memory-mapped
+        self._trained_size = 0  # Vectors the index was built (and for IVF, trained) with
+        
+        # Per-source summaries, maintained as documents are indexed
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.chunk_count = 0
     
-    def build_index(self, documents: List[Document]) -> None:
-        """Build FAISS index from documents."""
-        logger.info(f"Building FAISS index for {len(documents)} documents...")
+    def _track_documents(self, metadatas: List[dict]) -> None:
+        """Update per-source summaries and counters for newly indexed chunks."""
+        # Build on a copy and swap it in: /documents and get_stats iterate
+        # the published dict while ingest runs on another thread
+        sources = {source: dict(info) for source, info in self.sources.items()}
+        for metadata in metadatas:
+            source = metadata.get("source", "Unknown")
+            
+            info = sources.get(source)
+            if info is None:
+                info = sources[source] = {
+                    "file_name": metadata.get("file_name", "Unknown"),
+                    "file_type": metadata.get("file_type", "Unknown"),
+                    "source": source,
+                    "loaded_at": metadata.get("loaded_at", "Unknown"),
+                    "chunks": 0,
+                }
+            
+            info["chunks"] += 1
         
-        # Extract texts
-        texts = [doc.page_content for doc in documents]
+        self.sources = sources
+        self.chunk_count += len(metadatas)
+    
+    def _reset_tracking(self) -> None:
+        """Clear per-source summaries and counters."""
+        self.sources = {}
+        self.chunk_count = 0
+    
+    def build_index(self) -> None:
+        """Build FAISS index over every corpus row."""
+        texts = self.corpus.texts
+        logger.info(f"Building FAISS index for {len(texts)} documents...")
         
-        # Generate embeddings
-        embeddings = self.embedder.embed_texts(texts, show_progress=True)
+        # Generate embeddings (normalized so inner product == cosine similarity)
+        if texts:
+            embeddings = self.embedder.embed_texts(
+                texts, batch_size=settings.EMBEDDING_BATCH_SIZE, show_progress=True
+            )
+        else:
+            embeddings = np.empty((0, self.dimension), dtype=np.float32)
+        faiss.normalize_L2(embeddings)
         
-        # Create FAISS index
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(embeddings.astype('float32'))
+        # Create FAISS index (configured before it is published to searches)
+        index = self._add_embeddings(self._create_index(len(embeddings)), embeddings)
+        self._configure_search(index)
+        self.index = index
+        self._mmap_index_path = None
+        self._trained_size = self.index.ntotal
         
-        # Store documents and embeddings
-        self.documents = documents
-        self.doc_embeddings = embeddings
+        # Embeddings live only in the index (see reconstruct), texts in the corpus
+        self._reset_tracking()
+        self._track_documents(self.corpus.metadatas)
         
         logger.info(f"FAISS index built with {self.index.ntotal} vectors")
     
+    def update(self) -> None:
+        """
+        Index rows added to the corpus since the last build or update.
+        
+        Only the new chunks are embedded (not the whole corpus); falls back
+        to build_index when no index exists yet or the index no longer fits
+        the corpus size (see _needs_rebuild).
+        """
+        if self.index is None or self.index.ntotal == 0 or self._needs_rebuild():
+            self.build_index()
+            return
+        
+        start = self.index.ntotal
+        if start >= len(self.corpus):
+            return
+        
+        logger.info(f"Adding {len(self.corpus) - start} documents to FAISS index...")
+        
+        embeddings = self.embedder.embed_texts(
+            self.corpus.texts[start:],
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            show_progress=True,
+        )
+        faiss.normalize_L2(embeddings)
+        
+        # Searches run concurrently on the search pool and FAISS add is not
+        # safe against them, so add to a copy and swap the reference in. A
+        # memory-mapped index's inverted lists are read-only anyway: its copy
+        # is read fully into memory.
+        if self._mmap_index_path is not None:
+            logger.info("Reloading memory-mapped index into memory before adding")
+            index = faiss.read_index(str(self._mmap_index_path))
+        else:
+            index = faiss.clone_index(self.index)
+        index.add(embeddings)
+        self._configure_search(index)
+        
+        self.index = index
+        self._mmap_index_path = None
+        self._track_documents(self.corpus.metadatas[start:])
+        
+        logger.info(f"FAISS index now has {self.index.ntotal} vectors")
+    
+    def _needs_rebuild(self) -> bool:
+        """
+        Whether the corpus has outgrown the index.
+        
+        True when a flat index (used below FAISS_MIN_TRAIN_SIZE) would now
+        get an approximate index, or when an IVF index has grown
+        FAISS_RETRAIN_GROWTH times past the vectors its centroids were
+        trained on. HNSW needs no training and is extended in place.
+        """
+        num_vectors = len(self.corpus)
+        if isinstance(self.index, faiss.IndexFlat):
+            return (
+                settings.FAISS_INDEX_TYPE != "flat"
+                and num_vectors >= settings.FAISS_MIN_TRAIN_SIZE
+            )
+        
+        try:
+            faiss.extract_index_ivf(self.index)
+        except RuntimeError:
+            return False  # Not an IVF index
+        return num_vectors >= settings.FAISS_RETRAIN_GROWTH * self._trained_size
+    
+    def _create_index(self, num_vectors: int) -> faiss.Index:
+        """
+        Create an empty FAISS index for the given corpus size.
+        
+        Once the corpus reaches FAISS_MIN_TRAIN_SIZE, uses one of:
+        - "hnsw": HNSW graph (sub-linear search, no training, full vectors)
+        - "ivf_sq8": IVF with 8-bit scalar quantization (4x smaller than FP32)
+        - "ivf_pq": IVF with product quantization, storing each vector as
+          dimension/8 bytes of PQ codes (32x smaller than FP32, lossy). Only
+          used once there are enough vectors to train the PQ codebooks;
+          until then falls back to "ivf_sq8".
+        
+        Smaller corpora get an exact inner-product index.
+        """
+        if num_vectors < settings.FAISS_MIN_TRAIN_SIZE:
+            return faiss.IndexFlatIP(self.dimension)
+        
+        index_type = settings.FAISS_INDEX_TYPE
+        if index_type == "ivf_pq":
+            # FAISS wants ~39 training points per codebook centroid
+            min_pq_train_size = 39 * 2 ** settings.FAISS_PQ_NBITS
+            if num_vectors < min_pq_train_size:
+                logger.info(
+                    f"{num_vectors} vectors is too few to train PQ "
+                    f"(needs {min_pq_train_size}); using ivf_sq8"
+                )
+                index_type = "ivf_sq8"
+        
+        if index_type == "ivf_pq":
+            # ~4*sqrt(N) lists, keeping ~39 training points per centroid
+            nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+            pq_m = settings.FAISS_PQ_M or self.dimension // 8
+            return faiss.index_factory(
+                self.dimension,
+                f"IVF{nlist},PQ{pq_m}x{settings.FAISS_PQ_NBITS}",
+                faiss.METRIC_INNER_PRODUCT,
+            )
+        
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(
+                self.dimension, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+            return index
+        
+        if index_type == "ivf_sq8":
+            # ~39 training points per centroid is the FAISS minimum
+            nlist = max(1, min(settings.FAISS_NLIST, num_vectors // 39))
+            return faiss.index_factory(
+                self.dimension, f"IVF{nlist},SQ8", faiss.METRIC_INNER_PRODUCT
+            )
+        
+        return faiss.IndexFlatIP(self.dimension)
+    
+    @staticmethod
+    def _configure_search(index: faiss.Index) -> None:
+        """Apply search-time parameters (efSearch for HNSW, nprobe for IVF indexes)."""
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+            return
+        
+        try:
+            faiss.extract_index_ivf(index).nprobe = settings.FAISS_NPROBE
+        except RuntimeError:
+            pass  # Not an IVF index
+    
+    def _add_embeddings(self, cpu_index: faiss.Index, embeddings: np.ndarray) -> faiss.Index:
+        """
+        Train (if needed) and add embeddings in a single call, returning a CPU index.
+        
+        When a GPU is available the train/add of flat and IVF indexes runs on
+        the GPU, and the index is copied back to the CPU so it can be written to
+        disk. Embeddings must be C-contiguous float32 (as returned by Embedder).
+        """
+        index = cpu_index
+        # FAISS has no GPU implementation of HNSW
+        if gpu_available() and not hasattr(cpu_index, "hnsw"):
+            logger.info("Adding embeddings on GPU")
+            res = faiss.StandardGpuResources()
+            index = faiss.index_cpu_to_gpu(res, 0, cpu_index)
+        
+        if not index.is_trained:
+            # Train on a random sample (~256 points per centroid is plenty, for
+            # both the coarse quantizer and the 256-centroid PQ codebooks)
+            nlist = faiss.extract_index_ivf(cpu_index).nlist
+            sample_size = min(len(embeddings), max(nlist, 256) * 256)
+            sample_ids = np.random.default_rng(0).choice(
+                len(embeddings), sample_size, replace=False
+            )
+            logger.info(f"Training index with {nlist} lists on {sample_size} vectors")
+            index.train(embeddings[np.sort(sample_ids)])
+        
+        index.add(embeddings)
+        
+        if index is not cpu_index:
+            return faiss.index_gpu_to_cpu(index)
+        return index
+    
     def search(
         self,
         query: str,
         top_k: int = settings.VECTOR_TOP_K,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> List[Tuple[Document, float]]:
-        """Search for similar documents."""
+        """Search for similar documents (reusing query_embedding if provided)."""
         if self.index is None or self.index.ntotal == 0:
             logger.warning("Index is empty or not built")
             return []
         
         # Generate query embedding
-        query_embedding = self.embedder.embed_query(query)
-        query_embedding = query_embedding.reshape(1, -1).astype('float32')
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_query_cached(query)
+        return self.search_by_embedding(query_embedding, top_k)
+    
+    def search_by_embedding(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = settings.VECTOR_TOP_K,
+    ) -> List[Tuple[Document, float]]:
+        """Search for similar documents with a precomputed query embedding."""
+        # One reference for the whole search: update and build swap in new indexes
+        index = self.index
+        if index is None or index.ntotal == 0:
+            logger.warning("Index is empty or not built")
+            return []
+        
+        # Embedder returns normalized C-contiguous float32, so this is a view
+        query_embedding = query_embedding.reshape(1, -1)
         
         # Search
-        distances, indices = self.index.search(query_embedding, top_k)
+        scores, indices = index.search(query_embedding, top_k)
         
-        # Prepare results (convert L2 distance to similarity score)
+        # Prepare results (inner product of normalized vectors is cosine similarity;
+        # indexes built before the switch to inner product still return L2 distances).
+        # Documents are built only for the top-k rows.
+        is_l2 = index.metric_type == faiss.METRIC_L2
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.documents):
-                # Convert L2 distance to similarity (inverse)
-                similarity = 1 / (1 + dist)
-                results.append((self.documents[idx], float(similarity)))
+        for score, idx in zip(scores[0], indices[0]):
+            if 0 <= idx < len(self.corpus):
+                similarity = 1 / (1 + score) if is_l2 else score
+                results.append((self.corpus.document(int(idx)), float(similarity)))
         
         return results
     
+    def reconstruct(self, ids: List[int]) -> np.ndarray:
+        """
+        Reconstruct stored embeddings from the index.
+        
+        Vectors are not kept outside FAISS; for quantized indexes the result
+        is the decoded (approximate) vector.
+        """
+        try:
+            ivf = faiss.extract_index_ivf(self.index)
+            if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                ivf.make_direct_map()
+        except RuntimeError:
+            pass  # Not an IVF index; reconstruct is supported directly
+        
+        return self.index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+    
     def save(self, index_path: Path, metadata_path: Path) -> None:
         """Save FAISS index and metadata to disk."""
         if self.index is None:
             raise ValueError("No index to save")
         
-        # Save FAISS index
-        faiss.write_index(self.index, str(index_path))
+        # Save FAISS index. A memory-mapped index is unchanged since it was
+        # loaded (update reloads it first), and rewriting the mapped
+        # file would corrupt it, so it is only copied to a new location.
+        if self._mmap_index_path is not None:
+            if self._mmap_index_path.resolve() != Path(index_path).resolve():
+                shutil.copyfile(self._mmap_index_path, index_path)
+        else:
+            tmp_path = Path(index_path).with_name(Path(index_path).name + ".tmp")
+            faiss.write_index(self.index, str(tmp_path))
+            os.replace(tmp_path, index_path)
+        
+        # Save corpus rows as a columnar Parquet table
+        columns: Dict[str, list] = {name: [] for name in METADATA_SCHEMA.names}
+        columns["page_content"] = list(self.corpus.texts)
+        for metadata in self.corpus.metadatas:
+            for name in METADATA_COLUMNS:
+                columns[name].append(metadata.get(name))
+            extra = {k: v for k, v in metadata.items() if k not in METADATA_COLUMNS}
+            columns["extra_metadata"].append(json.dumps(extra, default=str))
         
-        # Save documents and embeddings
-        metadata = {
-            "documents": self.documents,
-            "embeddings": self.doc_embeddings,
-        }
-        with open(metadata_path, 'wb') as f:
-            pickle.dump(metadata, f)
+        table = pa.Table.from_pydict(columns, schema=METADATA_SCHEMA)
+        pq.write_table(table, str(metadata_path), compression="zstd")
         
         logger.info(f"Index saved to {index_path}")
         logger.info(f"Metadata saved to {metadata_path}")
     
+    def _load_metadata(self, metadata_path: Path) -> Tuple[List[str], List[dict]]:
+        """Load corpus texts and metadata from Parquet (or a legacy pickle)."""
+        if metadata_path.suffix == ".pkl":
+            with open(metadata_path, 'rb') as f:
+                documents: List[Document] = pickle.load(f)["documents"]
+            return [doc.page_content for doc in documents], [doc.metadata for doc in documents]
+        
+        columns = pq.read_table(str(metadata_path)).to_pydict()
+        metadatas = []
+        for i in range(len(columns["page_content"])):
+            metadata = {
+                name: columns[name][i]
+                for name in METADATA_COLUMNS
+                if columns[name][i] is not None
+            }
+            metadata.update(json.loads(columns["extra_metadata"][i]))
+            metadatas.append(metadata)
+        
+        return columns["page_content"], metadatas
+    
     def load(self, index_path: Path, metadata_path: Path) -> None:
-        """Load FAISS index and metadata from disk."""
-        # Load FAISS index
-        self.index = faiss.read_index(str(index_path))
+        """
+        Load FAISS index and metadata from disk, replacing the corpus rows.
         
-        # Load documents and embeddings
-        with open(metadata_path, 'rb') as f:
-            metadata = pickle.load(f)
+        With FAISS_MMAP, IVF inverted lists are memory-mapped instead of read
+        into RAM, so startup does not scale with index size and worker
+        processes share the pages; other index types are read normally.
+        """
+        # Load FAISS index
+        self.index = None
+        self._mmap_index_path = None
+        if settings.FAISS_MMAP:
+            try:
+                self.index = faiss.read_index(
+                    str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                faiss.extract_index_ivf(self.index)
+                self._mmap_index_path = index_path
+            except RuntimeError:
+                self.index = None  # Not an IVF index (or mmap unsupported)
+        if self.index is None:
+            self.index = faiss.read_index(str(index_path))
+        self._configure_search(self.index)
         
-        self.documents = metadata["documents"]
-        self.doc_embeddings = metadata["embeddings"]
+        # Load corpus rows (Corpus.add fills the doc IDs older versions lack).
+        # Vector i must be row i: a stale or partial file would misalign them
+        texts, metadatas = self._load_metadata(metadata_path)
+        if len(texts) != self.index.ntotal:
+            ntotal = self.index.ntotal
+            self.index = None
+            self._mmap_index_path = None
+            raise ValueError(
+                f"FAISS index has {ntotal} vectors, metadata has {len(texts)} rows"
+            )
+        self._trained_size = self.index.ntotal
+        self.corpus.clear()
+        self.corpus.add(texts, metadatas)
+        self._reset_tracking()
+        self._track_documents(self.corpus.metadatas)
         
         logger.info(f"Index loaded from {index_path} ({self.index.ntotal} vectors)")
     
@@ -109,5 +433,6 @@ class VectorStore:
         return {
             "total_vectors": self.index.ntotal if self.index else 0,
             "dimension": self.dimension,
-            "total_documents": len(self.documents),
+            "total_documents": self.chunk_count,
+            "total_sources": len(self.sources),
         }
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""Tests for the Numba BM25 index against rank_bm25."""
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from src.search.bm25 import NUMBA_AVAILABLE, BM25Index
+from src.search.corpus import Corpus
+
+pytestmark = pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba is not installed")
+
+# "the" appears in 4 of 5 documents, so its Okapi IDF is negative
+TEXTS = [
+    "the cat sat on the mat",
+    "the dog chased the cat",
+    "a bird sang in the tree",
+    "the cat and the dog are friends",
+    "quantum computing uses qubits",
+]
+
+
+def build(texts):
+    corpus = Corpus()
+    corpus.add(texts, [{} for _ in texts])
+    corpus.tokenize()
+    index = BM25Index.from_tokens(corpus.tokens, corpus.token_offsets, corpus.vocab)
+    return corpus, index
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        ["cat"],
+        ["cat", "dog"],
+        ["cat", "cat", "dog"],  # Repeated terms count once per occurrence
+        ["the"],  # Negative IDF floored at epsilon * mean IDF
+        ["the", "qubits"],
+        ["unknown"],
+    ],
+)
+def test_scores_match_rank_bm25(query):
+    corpus, index = build(TEXTS)
+    expected = BM25Okapi(corpus.token_lists()).get_scores(query)
+
+    np.testing.assert_allclose(index.get_scores(query), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_negative_idf_is_floored():
+    corpus, index = build(TEXTS)
+    bm25 = BM25Okapi(corpus.token_lists())
+
+    assert bm25.idf["the"] > 0  # rank_bm25 floors it too
+    assert index.idf[corpus.vocab["the"]] == pytest.approx(bm25.idf["the"], rel=1e-5)
+
+
+def test_terms_added_after_build_are_ignored():
+    corpus, index = build(TEXTS)
+    corpus.add(["zebra stripes"], [{}])
+    corpus.tokenize()  # Grows the shared vocabulary past the index
+
+    assert not index.get_scores(["zebra"]).any()
+
+
+def test_state_roundtrip():
+    corpus, index = build(TEXTS)
+    restored = BM25Index.from_state(index.get_state(), index.get_arrays(), corpus.vocab)
+
+    np.testing.assert_array_equal(
+        restored.get_scores(["cat", "dog"]), index.get_scores(["cat", "dog"])
+    )
+
+
+def test_kernel_compiled_once_for_writable_and_mmapped_arrays(tmp_path):
+    from src.search.bm25 import _bm25_scores
+
+    corpus, index = build(TEXTS)
+    expected = index.get_scores(["cat", "dog"])
+
+    arrays = {}
+    for name, array in index.get_arrays().items():
+        np.save(tmp_path / f"{name}.npy", array)
+        arrays[name] = np.load(tmp_path / f"{name}.npy", mmap_mode="r")
+        assert not arrays[name].flags.writeable
+    mapped = BM25Index.from_state(index.get_state(), arrays, corpus.vocab)
+
+    np.testing.assert_array_equal(mapped.get_scores(["cat", "dog"]), expected)
+    # Both calls used the signature compiled at import; nothing compiled lazily
+    assert len(_bm25_scores.signatures) == 1
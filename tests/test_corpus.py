@@ -0,0 +1,132 @@
+"""Tests for the shared corpus and BM25 keyword search persistence."""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.search.corpus import Corpus, tokenize
+from src.search.keyword_search import KeywordSearch
+
+TEXTS = [
+    "the cat sat on the mat",
+    "the dog chased the cat",
+    "a bird sang in the tree",
+    "quantum computing uses qubits",
+]
+
+
+def make_documents(texts):
+    return [
+        Document(page_content=text, metadata={"source": f"doc{i}.txt"})
+        for i, text in enumerate(texts)
+    ]
+
+
+def row_tokens(corpus, row):
+    start, end = corpus.token_offsets[row], corpus.token_offsets[row + 1]
+    return [corpus.terms[term] for term in corpus.tokens[start:end]]
+
+
+def test_tokenize_incremental_offsets():
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS[:2]))
+    corpus.tokenize()
+    corpus.add_documents(make_documents(TEXTS[2:]))
+    corpus.tokenize()
+
+    lengths = [len(tokenize(text)) for text in TEXTS]
+    np.testing.assert_array_equal(corpus.token_offsets, np.concatenate([[0], np.cumsum(lengths)]))
+    assert corpus.num_tokenized == len(TEXTS)
+    assert [row_tokens(corpus, row) for row in range(len(TEXTS))] == [
+        tokenize(text) for text in TEXTS
+    ]
+
+    # Terms shared by both batches are interned once
+    assert len(corpus.terms) == len(set(corpus.terms)) == len(corpus.vocab)
+
+
+def test_add_assigns_doc_ids():
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS))
+
+    assert all("doc_id" in metadata for metadata in corpus.metadatas)
+    assert corpus.document(1).page_content == TEXTS[1]
+
+
+def test_set_tokens_rejects_row_count_mismatch():
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS))
+
+    with pytest.raises(ValueError):
+        corpus.set_tokens([], np.empty(0, dtype=np.int32), np.zeros(2, dtype=np.int64))
+
+
+def results(keyword_search, query):
+    return [(doc.page_content, score) for doc, score in keyword_search.search(query, top_k=3)]
+
+
+def assert_same_results(actual, expected):
+    assert [text for text, _ in actual] == [text for text, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected])
+
+
+def test_save_load_roundtrip(tmp_path):
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS))
+    keyword_search = KeywordSearch(corpus)
+    keyword_search.build_index()
+    path = tmp_path / "bm25.pkl"
+    keyword_search.save(path)
+
+    loaded_corpus = Corpus()
+    loaded_corpus.add_documents(make_documents(TEXTS))
+    loaded = KeywordSearch(loaded_corpus)
+    loaded.load(path)
+
+    for query in ["mat", "the dog", "qubits"]:
+        expected = results(keyword_search, query)
+        assert expected
+        assert_same_results(results(loaded, query), expected)
+
+
+def test_load_rejects_different_corpus(tmp_path):
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS))
+    keyword_search = KeywordSearch(corpus)
+    keyword_search.build_index()
+    path = tmp_path / "bm25.pkl"
+    keyword_search.save(path)
+
+    smaller = Corpus()
+    smaller.add_documents(make_documents(TEXTS[:2]))
+    with pytest.raises(ValueError):
+        KeywordSearch(smaller).load(path)
+
+
+def test_update_matches_full_build():
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS[:2]))
+    incremental = KeywordSearch(corpus)
+    incremental.build_index()
+    corpus.add_documents(make_documents(TEXTS[2:]))
+    incremental.update()
+
+    full_corpus = Corpus()
+    full_corpus.add_documents(make_documents(TEXTS))
+    full = KeywordSearch(full_corpus)
+    full.build_index()
+
+    assert_same_results(results(incremental, "the cat"), results(full, "the cat"))
+
+
+def test_search_skips_rows_cleared_from_corpus():
+    corpus = Corpus()
+    corpus.add_documents(make_documents(TEXTS))
+    keyword_search = KeywordSearch(corpus)
+    keyword_search.build_index()
+
+    # As when /documents/clear lands between a search reading the index and
+    # building its results
+    corpus.clear()
+
+    assert keyword_search.search("cat") == []